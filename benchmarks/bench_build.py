@@ -0,0 +1,168 @@
+"""Time full HTML builds of generated projects documenting more and more sub-commands.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_build --sizes 10,100,1000,10000 --output build.json
+
+Every project documents one script whose parser has the given number of
+sub-commands, each with ``--options`` options, in a single ``argparse``
+directive.  The read phase (parsing the documents, running the directive) and
+the write phase (resolving and writing the HTML) are timed separately.
+
+Between consecutive sizes, the time per sub-command may grow by at most
+``--threshold`` times; a larger growth points to a super-linear algorithm, and
+the exit status is 1.  Small sizes are dominated by the fixed cost of a build,
+so their time per sub-command is usually higher than that of larger ones.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import itertools
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sphinx.application import Sphinx
+from sphinx.util.docutils import docutils_namespace, patch_docutils
+
+from benchmarks.synthetic import build_script
+
+CONF = "extensions = ['sphinxarg.ext']\n"
+
+INDEX = """\
+Synthetic
+=========
+
+.. argparse::
+   :filename: cli.py
+   :func: get_parser
+   :prog: synthetic
+"""
+
+PHASES = ('read', 'write')
+
+
+def make_project(directory, subcommands, options):
+    """Write a project documenting a parser with *subcommands* sub-commands to *directory*."""
+    directory.mkdir(parents=True)
+    (directory / 'conf.py').write_text(CONF, encoding='utf-8')
+    (directory / 'index.rst').write_text(INDEX, encoding='utf-8')
+    script = build_script(breadth=subcommands, depth=1, options=options)
+    (directory / 'cli.py').write_text(script, encoding='utf-8')
+
+
+def build(srcdir, outdir, prepare=None):
+    """Build *srcdir* as HTML into *outdir*, return the seconds per phase and the warnings.
+
+    *prepare*, if given, is called with the application before the build.
+    """
+    marks = {}
+
+    def mark(name):
+        def handler(*args):
+            marks[name] = time.perf_counter()
+
+        return handler
+
+    warnings = io.StringIO()
+    # Like sphinx-build, so that builds don't share registered nodes and directives
+    with patch_docutils(srcdir), docutils_namespace():
+        app = Sphinx(
+            srcdir,
+            srcdir,
+            outdir / 'html',
+            outdir / 'doctrees',
+            'html',
+            status=None,
+            warning=warnings,
+            freshenv=True,
+        )
+        app.connect('env-before-read-docs', mark('read'))
+        app.connect('env-updated', mark('write'))
+        app.connect('build-finished', mark('finished'))
+        if prepare is not None:
+            prepare(app)
+        app.build()
+    return {
+        'read': marks['write'] - marks['read'],
+        'write': marks['finished'] - marks['write'],
+    }, warnings.getvalue()
+
+
+def check_scaling(results, threshold):
+    """Print the growth of the time per sub-command, return the sizes that grew too much."""
+    failures = []
+    for before, after in itertools.pairwise(results):
+        for phase in (*PHASES, 'total'):
+            per_before = before[phase] / before['subcommands']
+            per_after = after[phase] / after['subcommands']
+            growth = per_after / per_before
+            flag = ''
+            if growth > threshold:
+                flag = '  SUPER-LINEAR'
+                failures.append((before['subcommands'], after['subcommands'], phase))
+            print(
+                f'{before["subcommands"]:>6} -> {after["subcommands"]:<6} {phase:5} '
+                f'time per sub-command x{growth:.2f}{flag}'
+            )
+    return failures
+
+
+def main(argv=None):
+    cli = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cli.add_argument(
+        '--sizes',
+        default='10,100,1000,10000',
+        help='Comma separated numbers of sub-commands, in increasing order.',
+    )
+    cli.add_argument('--options', type=int, default=5)
+    cli.add_argument('--repeat', type=int, default=1)
+    cli.add_argument('--output', help='Write the results as JSON to this file.')
+    cli.add_argument(
+        '--threshold',
+        type=float,
+        default=2.0,
+        help='Fail when the time per sub-command grows more than this between two sizes.',
+    )
+    args = cli.parse_args(argv)
+    sizes = sorted(map(int, args.sizes.split(',')))
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            srcdir = Path(tmp, f'project-{size}')
+            make_project(srcdir, size, args.options)
+            runs = []
+            for i in range(args.repeat):
+                phases, warnings = build(srcdir, Path(tmp, f'build-{size}-{i}'))
+                if warnings:
+                    msg = f'The build of {size} sub-commands warned:\n{warnings}'
+                    raise SystemExit(msg)
+                runs.append(phases)
+            best = min(runs, key=lambda phases: sum(phases.values()))
+            result = {'subcommands': size, **best, 'total': sum(best.values())}
+            results.append(result)
+            print(
+                f'{size:>6} sub-commands  read {result["read"]:8.3f}s  '
+                f'write {result["write"]:8.3f}s  total {result["total"]:8.3f}s'
+            )
+
+    if args.output:
+        report = {
+            'params': {'options': args.options},
+            'python': platform.python_version(),
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if check_scaling(results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""Measure the memory allocated by each stage of building generated projects.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_memory --sizes 100,1000,4000 --output memory.json
+
+and, after a change, compare with the saved results::
+
+    python -m benchmarks.bench_memory --sizes 100,1000,4000 --baseline memory.json
+
+Every size is built in a fresh process, like `benchmarks.bench_build`, with
+:mod:`tracemalloc` tracing the allocations.  For every stage, the peak is the
+most memory allocated at once while it ran, and the retained memory is what it
+had not freed when it finished:
+
+``extraction``
+    importing or executing the script, calling the factory and ``parse_parser``
+``nodes``
+    rendering the tree into nodes, navigating ``:path:`` and ``ensure_unique_ids``
+``pickle``
+    pickling the doctree of the document
+``domain``
+    registering the commands in the ``argparse`` domain; the retained memory is
+    that of a copy of the domain data at the end of the build, as the domain
+    phases are too short to tell their allocations from garbage collections
+
+The peak RSS of the process is reported too; it includes the tracing overhead.
+A stage whose peak or retained memory exceeds the baseline's by more than
+``--threshold`` is flagged as a regression, and the exit status is 1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import pickle
+import platform
+import resource
+import sys
+import tempfile
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks.bench_build import build, make_project
+from sphinxarg.ext import ArgParseDirective, ArgParseDomain
+
+#: The phases of `sphinxarg.timing` counted in each stage
+STAGES = {
+    'extraction': ('import', 'factory', 'parse'),
+    'nodes': ('navigate', 'render', 'unique_ids'),
+    'pickle': ('pickle',),
+    'domain': ('domain',),
+}
+
+
+class MemoryPhases:
+    """Stands in for the directive timing, recording the allocations of each phase.
+
+    A phase nested in another one, like registering a sub-command in the domain
+    while rendering it, counts in the peak of both.
+    """
+
+    def __init__(self):
+        self.peaks = {}
+        self.retained = {}
+        self.peak = 0
+        self._stack = []
+
+    def _fold(self):
+        """Count the peak since the last reset for the current phase and start over."""
+        _, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak)
+        for name, base in self._stack:
+            self.peaks[name] = max(self.peaks.get(name, 0), peak - base)
+        tracemalloc.reset_peak()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self._fold()
+        base, _ = tracemalloc.get_traced_memory()
+        self._stack.append((name, base))
+        try:
+            yield
+        finally:
+            self._fold()
+            self._stack.pop()
+            current, _ = tracemalloc.get_traced_memory()
+            self.retained[name] = self.retained.get(name, 0) + current - base
+
+
+def measure(size, options):
+    """Build a project with *size* sub-commands, return the memory used per stage."""
+    phases = MemoryPhases()
+    # Directives use the class attribute unless sphinxarg_timing is enabled
+    ArgParseDirective._timing = phases
+
+    domain_size = 0
+
+    def measure_domain(app, _err):
+        nonlocal domain_size
+        data = app.env.get_domain(ArgParseDomain.name).data
+        base, _ = tracemalloc.get_traced_memory()
+        copy = pickle.loads(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))  # noqa: S301
+        domain_size = tracemalloc.get_traced_memory()[0] - base
+        del copy
+
+    def prepare(app):
+        write_doctree = app.builder.write_doctree
+
+        def traced(*args, **kwargs):
+            with phases.phase('pickle'):
+                return write_doctree(*args, **kwargs)
+
+        app.builder.write_doctree = traced
+        app.connect('build-finished', measure_domain)
+
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        srcdir = Path(tmp, 'project')
+        make_project(srcdir, size, options)
+        _, warnings = build(srcdir, Path(tmp, 'build'), prepare=prepare)
+    phases._fold()
+    tracemalloc.stop()
+    if warnings:
+        msg = f'The build of {size} sub-commands warned:\n{warnings}'
+        raise SystemExit(msg)
+
+    stages = {
+        stage: {
+            'peak': max(phases.peaks.get(name, 0) for name in names),
+            'retained': sum(phases.retained.get(name, 0) for name in names),
+        }
+        for stage, names in STAGES.items()
+    }
+    stages['domain']['retained'] = domain_size
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'subcommands': size,
+        'stages': stages,
+        'traced_peak': phases.peak,
+        'peak_rss': rss if sys.platform == 'darwin' else rss * 1024,
+    }
+
+
+def _kib(size):
+    return f'{size / 1024:10.0f}KiB'
+
+
+def report(result):
+    print(
+        f'{result["subcommands"]:>6} sub-commands  traced peak {_kib(result["traced_peak"])}  '
+        f'peak RSS {_kib(result["peak_rss"])}'
+    )
+    for stage, usage in result['stages'].items():
+        print(
+            f'       {stage:10}  peak {_kib(usage["peak"])}  '
+            f'retained {_kib(usage["retained"])}'
+        )
+
+
+def compare(results, baseline, threshold):
+    """Print the stages against *baseline*, return the regressed sizes, stages and kinds."""
+    before_by_size = {result['subcommands']: result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        size = result['subcommands']
+        before = before_by_size.get(size)
+        if before is None:
+            print(f'{size:>6} sub-commands  (not in baseline)')
+            continue
+        for stage, usage in result['stages'].items():
+            for kind in ('peak', 'retained'):
+                previous = before['stages'][stage][kind]
+                ratio = usage[kind] / previous if previous > 0 else 1.0
+                flag = ''
+                if ratio > 1 + threshold:
+                    flag = '  REGRESSION'
+                    regressions.append((size, stage, kind))
+                print(
+                    f'{size:>6} {stage:10}  {kind:8} {_kib(usage[kind])}  '
+                    f'baseline {_kib(previous)}  x{ratio:.2f}{flag}'
+                )
+    return regressions
+
+
+def main(argv=None):
+    cli = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cli.add_argument(
+        '--sizes',
+        default='100,1000',
+        help='Comma separated numbers of sub-commands.',
+    )
+    cli.add_argument('--options', type=int, default=5)
+    cli.add_argument('--output', help='Write the results as JSON to this file.')
+    cli.add_argument('--baseline', help='Compare with the JSON results in this file.')
+    cli.add_argument(
+        '--threshold',
+        type=float,
+        default=0.1,
+        help='Flag stages using more memory than the baseline by more than this fraction.',
+    )
+    args = cli.parse_args(argv)
+    sizes = sorted(map(int, args.sizes.split(',')))
+
+    results = []
+    for size in sizes:
+        # A fresh process per size, so that the peak RSS is that of one build
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            result = pool.submit(measure, size, args.options).result()
+        results.append(result)
+        report(result)
+
+    params = {'options': args.options}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'params': params, 'python': platform.python_version(), 'results': results},
+                f,
+                indent=2,
+            )
+    if args.baseline is None:
+        return
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['params'] != params:
+        msg = f'The baseline was measured with other parameters: {baseline["params"]}'
+        raise SystemExit(msg)
+    if compare(results, baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
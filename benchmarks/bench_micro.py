@@ -0,0 +1,207 @@
+"""Time the extraction and rendering helpers separately on a synthetic parser.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_micro --breadth 6 --depth 2 --options 10 --output micro.json
+
+and, after a change, compare with the saved results::
+
+    python -m benchmarks.bench_micro --breadth 6 --depth 2 --options 10 --baseline micro.json
+
+A benchmark whose best time exceeds the baseline's by more than ``--threshold``
+is flagged as a regression, and the exit status is 1.  Timings are only
+comparable on the same machine and with the same parameters.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+from docutils import nodes
+from docutils.frontend import get_default_settings
+from docutils.parsers.rst import Parser
+from docutils.utils import new_document
+
+from benchmarks.synthetic import build_parser
+from sphinxarg.ext import (
+    ensure_unique_ids,
+    map_nested_definitions,
+    render_list,
+    render_lists,
+)
+from sphinxarg.parser import parse_parser, parser_navigate
+
+
+def _walk(tree):
+    pending = [tree]
+    while pending:
+        node = pending.pop()
+        yield node
+        pending.extend(reversed(node.get('children', ())))
+
+
+def nested_content(tree, settings):
+    """Return the nodes of directive content with a definition for every option."""
+    names = sorted({
+        option['name'][0]
+        for node in _walk(tree)
+        for group in node['action_groups']
+        for option in group['options']
+    })
+    lines = []
+    for i, name in enumerate(names):
+        classifier = ('@after', '@before', '@replace')[i % 3]
+        lines += [f'{name} : {classifier}', f'    Extra text for ``{name}``.', '']
+    document = new_document('', settings)
+    Parser().parse('\n'.join(lines), document)
+    return document.children
+
+
+def sections(tree):
+    """Return section nodes laid out like rendered sub-commands, with repeated ids."""
+    root = nodes.section(ids=['synthetic'])
+    pending = [(tree, root)]
+    while pending:
+        node, section = pending.pop()
+        section += nodes.section(ids=['positional-arguments'])
+        section += nodes.section(ids=['named-arguments'])
+        for child in node.get('children', ()):
+            child_section = nodes.section(ids=[child['name'], 'sub-commands'])
+            section += child_section
+            pending.append((child, child_section))
+    return [root]
+
+
+def benchmarks(parser):
+    """Return ``{name: (setup, run)}``; *run* is timed with the result of *setup*."""
+    settings = get_default_settings(Parser)
+    tree = parse_parser(parser)
+    paths = [' '.join(path) for path in tree.index.nodes]
+    helps = [
+        option['help']
+        for node in _walk(tree)
+        for group in node['action_groups']
+        for option in group['options']
+        if option['help']
+    ]
+    groups = [
+        [[option['help']] for option in group['options'] if option['help']]
+        for node in _walk(tree)
+        for group in node['action_groups']
+    ]
+    content = nested_content(tree, settings)
+
+    def navigate_all(tree):
+        for path in paths:
+            parser_navigate(tree, path)
+
+    def render_all(helps):
+        for text in helps:
+            render_list([text], False, settings)
+
+    def render_groups(groups):
+        for descs in groups:
+            render_lists(descs, False, settings)
+
+    return {
+        'parse_parser': (lambda: parser, parse_parser),
+        'parser_navigate': (lambda: tree, navigate_all),
+        'render_list': (lambda: helps, render_all),
+        'render_lists': (lambda: groups, render_groups),
+        'map_nested_definitions': (lambda: content, map_nested_definitions),
+        'ensure_unique_ids': (lambda: sections(tree), ensure_unique_ids),
+    }
+
+
+def measure(setup, run, repeat):
+    timings = []
+    for _ in range(repeat):
+        argument = setup()
+        start = time.perf_counter()
+        run(argument)
+        timings.append(time.perf_counter() - start)
+    return {'best': min(timings), 'median': statistics.median(timings), 'runs': repeat}
+
+
+def compare(results, baseline, threshold):
+    """Print *results* against *baseline*, return the names of regressed benchmarks."""
+    regressions = []
+    for name, result in results['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f'{name:24} {result["best"] * 1000:10.2f}ms  (not in baseline)')
+            continue
+        ratio = result['best'] / before['best']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(
+            f'{name:24} {result["best"] * 1000:10.2f}ms  '
+            f'baseline {before["best"] * 1000:10.2f}ms  x{ratio:.2f}{flag}'
+        )
+    return regressions
+
+
+def main(argv=None):
+    cli = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cli.add_argument('--breadth', type=int, default=6)
+    cli.add_argument('--depth', type=int, default=2)
+    cli.add_argument('--options', type=int, default=10)
+    cli.add_argument('--choices', type=int, default=5)
+    cli.add_argument('--help-length', type=int, default=120)
+    cli.add_argument('--repeat', type=int, default=5)
+    cli.add_argument('--output', help='Write the results as JSON to this file.')
+    cli.add_argument('--baseline', help='Compare with the JSON results in this file.')
+    cli.add_argument(
+        '--threshold',
+        type=float,
+        default=0.25,
+        help='Flag benchmarks slower than the baseline by more than this fraction.',
+    )
+    args = cli.parse_args(argv)
+
+    params = {
+        'breadth': args.breadth,
+        'depth': args.depth,
+        'options': args.options,
+        'choices': args.choices,
+        'help_length': args.help_length,
+    }
+    parser = build_parser(**params)
+    results = {
+        'params': params,
+        'python': platform.python_version(),
+        'results': {
+            name: measure(setup, run, args.repeat)
+            for name, (setup, run) in benchmarks(parser).items()
+        },
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline is None:
+        for name, result in results['results'].items():
+            print(
+                f'{name:24} best {result["best"] * 1000:10.2f}ms  '
+                f'median {result["median"] * 1000:10.2f}ms'
+            )
+        return
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['params'] != params:
+        msg = f'The baseline was measured with other parameters: {baseline["params"]}'
+        raise SystemExit(msg)
+    if compare(results, baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
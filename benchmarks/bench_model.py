@@ -0,0 +1,86 @@
+"""Compare the memory used by the slotted parse tree with plain dictionaries.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_model --breadth 10 --depth 3 --options 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from collections.abc import Mapping
+
+from benchmarks.synthetic import build_parser
+from sphinxarg.model import ParserNode, _Record
+from sphinxarg.parser import parse_parser
+
+
+def legacy_tree(node, parent=None):
+    """Return *node* as the nested dictionaries built before the slotted model."""
+    data = {key: value for key, value in node.items() if key not in {'parent', 'children'}}
+    if parent is not None:
+        data['parent'] = {'name': parent.get('name', ''), 'prog': parent.get('prog', '')}
+        if 'parent' in parent:
+            data['parent']['parent'] = parent['parent']
+    if 'action_groups' in data:
+        data['action_groups'] = [
+            {
+                'title': group['title'],
+                'description': group['description'],
+                'options': [dict(option) for option in group['options']],
+            }
+            for group in data['action_groups']
+        ]
+    if node.children is not None:
+        data['children'] = [legacy_tree(child, data) for child in node.children]
+    return data
+
+
+def deep_sizeof(root):
+    """Return the size in bytes of all objects reachable from *root*, counted once."""
+    seen = set()
+    total = 0
+    pending = [root]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, _Record):
+            pending.extend(getattr(obj, slot) for slot in type(obj).__slots__)
+        elif isinstance(obj, Mapping):
+            pending.extend(obj.keys())
+            pending.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            pending.extend(obj)
+    return total
+
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for child in node.children or ())
+
+
+def main(argv=None):
+    cli = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cli.add_argument('--breadth', type=int, default=10)
+    cli.add_argument('--depth', type=int, default=3)
+    cli.add_argument('--options', type=int, default=20)
+    args = cli.parse_args(argv)
+
+    tree = parse_parser(build_parser(args.breadth, args.depth, args.options))
+    assert isinstance(tree, ParserNode)
+    legacy = legacy_tree(tree)
+    assert legacy == tree
+
+    model_size = deep_sizeof(tree)
+    legacy_size = deep_sizeof(legacy)
+    print(f'parsers:       {count_nodes(tree)}')
+    print(f'dictionaries:  {legacy_size / 1024:,.0f} KiB')
+    print(f'slotted model: {model_size / 1024:,.0f} KiB')
+    print(f'reduction:     {1 - model_size / legacy_size:.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Compare serial extraction with thread and process pools for the top-level subtrees.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_parallel --breadth 16 --depth 3 --options 20 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+from benchmarks import synthetic
+from sphinxarg.loader import ParserSource
+from sphinxarg.parallel import MODES, shutdown_executor, subtree_submitter
+from sphinxarg.parser import parse_parser
+
+
+def extract(source, mode, workers):
+    """Load and extract the parser of *source*, return the tree and the time taken."""
+    start = time.perf_counter()
+    submit = subtree_submitter(mode, workers, source, '')
+    tree = parse_parser(source.load(), submit=submit)
+    return tree, time.perf_counter() - start
+
+
+def main(argv=None):
+    cli = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cli.add_argument('--breadth', type=int, default=16)
+    cli.add_argument('--depth', type=int, default=3)
+    cli.add_argument('--options', type=int, default=20)
+    cli.add_argument('--workers', type=int, default=os.cpu_count())
+    cli.add_argument('--repeat', type=int, default=3)
+    args = cli.parse_args(argv)
+
+    # Worker processes build the parser themselves, from the same environment
+    os.environ[synthetic.SIZE_VARIABLE] = f'{args.breadth},{args.depth},{args.options}'
+    source = ParserSource('module', 'benchmarks.synthetic', 'parser_from_environment')
+
+    serial, _ = extract(source, None, None)
+    for mode in (None, *MODES):
+        timings = []
+        for _ in range(args.repeat):
+            # The first run of a pool includes starting its workers
+            tree, seconds = extract(source, mode, args.workers)
+            assert tree == serial, mode
+            timings.append(seconds)
+        shutdown_executor()
+        print(f'{mode or "serial":8} best {min(timings):.3f}s  first {timings[0]:.3f}s')
+
+
+if __name__ == '__main__':
+    main()
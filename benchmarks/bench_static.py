@@ -0,0 +1,60 @@
+"""Compare reading a :filename: script statically with executing it.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_static --breadth 10 --depth 2 --options 20 --side-effect 0.05
+
+``--side-effect`` adds a module level statement taking that many seconds, like
+an expensive import or other setup in a real script.  It only delays exec.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import build_script
+from sphinxarg.loader import call_factory, exec_factory
+from sphinxarg.parser import parse_parser
+from sphinxarg.static import load_static
+
+
+def load_exec(filename):
+    return call_factory(exec_factory(filename, 'get_parser'))
+
+
+def load_statically(filename):
+    return load_static(filename, 'get_parser')
+
+
+def main(argv=None):
+    cli = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cli.add_argument('--breadth', type=int, default=10)
+    cli.add_argument('--depth', type=int, default=2)
+    cli.add_argument('--options', type=int, default=20)
+    cli.add_argument('--side-effect', type=float, default=0.0, metavar='SECONDS')
+    cli.add_argument('--repeat', type=int, default=5)
+    args = cli.parse_args(argv)
+
+    preamble = f'import time\ntime.sleep({args.side_effect!r})' if args.side_effect else ''
+    source = build_script(args.breadth, args.depth, args.options, preamble=preamble)
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = str(Path(tmp, 'script.py'))
+        Path(filename).write_text(source)
+        print(f'{len(source.splitlines())} lines')
+
+        expected = parse_parser(load_exec(filename))
+        for name, load in (('exec', load_exec), ('static', load_statically)):
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                parser = load(filename)
+                timings.append(time.perf_counter() - start)
+            assert parse_parser(parser) == expected, name
+            print(f'{name:6} best {min(timings) * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
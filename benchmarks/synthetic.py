@@ -0,0 +1,92 @@
+"""Generate synthetic argparse parser trees of configurable size."""
+
+from __future__ import annotations
+
+import argparse
+import os
+
+#: Sentence repeated to lengthen help texts, with some inline markup to parse
+FILLER = 'Reads the *config* file, see ``--option-0`` and **notes**. '
+
+
+def help_text(text, length=0):
+    """Return *text*, followed by `FILLER` sentences up to at least *length* characters."""
+    if len(text) >= length:
+        return text
+    repeats = -(-(length - len(text) - 1) // len(FILLER))
+    return f'{text} {FILLER * repeats}'.rstrip()
+
+
+def build_parser(breadth=10, depth=2, options=10, prog='synthetic', choices=0, help_length=0):
+    """Return a parser with *breadth* sub-commands per level, *depth* levels deep.
+
+    Every parser gets *options* optional arguments and one positional argument.
+    Options have *choices* choices each, if any, and help texts of at least
+    *help_length* characters.
+    """
+    parser = argparse.ArgumentParser(prog=prog, description=f'The {prog} command.')
+    option_choices = [f'choice{j}' for j in range(choices)] or None
+    pending = [(parser, 0, prog)]
+    while pending:
+        current, level, name = pending.pop()
+        current.add_argument('target', help=help_text(f'Target of {name}.', help_length))
+        for i in range(options):
+            current.add_argument(
+                f'--option-{i}',
+                default=str(i),
+                choices=option_choices,
+                help=help_text(f'Option {i} of {name} (%(default)s).', help_length),
+            )
+        if level == depth:
+            continue
+        subparsers = current.add_subparsers()
+        for i in range(breadth):
+            child_name = f'cmd{i}'
+            child = subparsers.add_parser(child_name, help=f'Sub-command {child_name}.')
+            pending.append((child, level + 1, f'{name} {child_name}'))
+    return parser
+
+
+#: Environment variable holding ``breadth,depth,options`` for `parser_from_environment`
+SIZE_VARIABLE = 'SPHINXARG_SYNTHETIC_SIZE'
+
+
+def parser_from_environment():
+    """Parser factory sized by the environment, importable by worker processes."""
+    breadth, depth, options = map(int, os.environ.get(SIZE_VARIABLE, '10,2,10').split(','))
+    return build_parser(breadth, depth, options)
+
+
+def build_script(breadth=10, depth=2, options=10, prog='synthetic', preamble=''):
+    """Return the source of a script whose ``get_parser`` builds `build_parser`'s parser.
+
+    Every argument is added by a literal call, so the script can be read
+    statically.  *preamble* is inserted at module level, before the function.
+    """
+    lines = ['import argparse', '', preamble, '', 'def get_parser():']
+    description = f'The {prog} command.'
+    lines.append(f'    parser = argparse.ArgumentParser({prog=!r}, {description=!r})')
+    pending = [('parser', 0, prog)]
+    counter = 0
+    while pending:
+        variable, level, name = pending.pop()
+        lines.append(f'    {variable}.add_argument("target", help={f"Target of {name}."!r})')
+        lines.extend(
+            f'    {variable}.add_argument("--option-{i}", default={str(i)!r}, '
+            f'help={f"Option {i} of {name} (%(default)s)."!r})'
+            for i in range(options)
+        )
+        if level == depth:
+            continue
+        subparsers = f'sub{counter}'
+        counter += 1
+        lines.append(f'    {subparsers} = {variable}.add_subparsers()')
+        for i in range(breadth):
+            child = f'p{counter}'
+            counter += 1
+            lines.append(
+                f'    {child} = {subparsers}.add_parser("cmd{i}", help="Sub-command cmd{i}.")'
+            )
+            pending.append((child, level + 1, f'{name} cmd{i}'))
+    lines.append('    return parser')
+    return '\n'.join(lines) + '\n'
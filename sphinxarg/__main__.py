@@ -0,0 +1,147 @@
+"""Command line interface of sphinx-argparse.
+
+``python -m sphinxarg dump`` extracts a parser without Sphinx and writes a
+JSON snapshot of it (see :mod:`sphinxarg.snapshot`)::
+
+    python -m sphinxarg dump --ref my.module.get_parser --prog fancytool -o cli.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+
+from sphinxarg.cache import fingerprint, module_source_files
+from sphinxarg.loader import ParserSource
+from sphinxarg.parser import parse_parser_path
+from sphinxarg.snapshot import dump_snapshot
+
+
+def _source(args):
+    """Return the :class:`~sphinxarg.loader.ParserSource` named by *args*."""
+    if args.ref is not None:
+        module_name, _, attr_name = args.ref.rpartition('.')
+        if not module_name:
+            msg = f'--ref needs a module and a function name: {args.ref!r}'
+            raise SystemExit(msg)
+        return ParserSource(
+            'module', module_name, attr_name, args.passparser, args.mock_import
+        )
+    if args.func is None:
+        msg = '--func is required with --module and --filename'
+        raise SystemExit(msg)
+    if args.module is not None:
+        return ParserSource(
+            'module', args.module, args.func, args.passparser, args.mock_import
+        )
+    return ParserSource(
+        'filename',
+        os.path.realpath(args.filename),
+        args.func,
+        args.passparser,
+        display_name=args.filename,
+        static=args.static,
+    )
+
+
+def dump(args):
+    source = _source(args)
+    kwargs = {
+        'skip_default_values': args.nodefault,
+        'skip_default_const_values': args.nodefaultconst,
+        'color': args.color,
+        'formatter_width': args.formatter_width,
+        'prog': args.prog,
+    }
+    tree = parse_parser_path(source.load(), args.path, **kwargs)
+
+    if source.kind == 'filename':
+        source_files = [source.location]
+    else:
+        source_files = module_source_files(source.location)
+    source_fingerprint = None
+    if source_files is not None:
+        key = (
+            source.kind,
+            source.location,
+            source.attr_name,
+            source.passparser,
+            *kwargs.values(),
+        )
+        key += (args.path, source.mock_imports)
+        if args.formatter_width is None:
+            key += (shutil.get_terminal_size().columns,)
+        source_fingerprint = fingerprint(key, source_files)
+
+    description = {
+        source.kind: source.display_name or source.location,
+        'func': source.attr_name,
+        'passparser': source.passparser,
+        'path': args.path,
+        **kwargs,
+    }
+    if args.output == '-':
+        dump_snapshot(tree, sys.stdout, fingerprint=source_fingerprint, source=description)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            dump_snapshot(tree, f, fingerprint=source_fingerprint, source=description)
+
+
+def main(argv=None):
+    cli = argparse.ArgumentParser(
+        prog='python -m sphinxarg', description='sphinx-argparse command line tools.'
+    )
+    commands = cli.add_subparsers(dest='command', required=True)
+
+    dump_cli = commands.add_parser(
+        'dump',
+        help='Write a JSON snapshot of an extracted parser.',
+        description='Extract a parser like the argparse directive does and write a '
+        'JSON snapshot of it.',
+    )
+    source = dump_cli.add_mutually_exclusive_group(required=True)
+    source.add_argument('--module', help='Module holding the parser factory.')
+    source.add_argument('--ref', help='Dotted name of the parser factory.')
+    source.add_argument('--filename', help='Python file holding the parser factory.')
+    dump_cli.add_argument('--func', help='Name of the parser factory.')
+    dump_cli.add_argument('--prog', help="Program name to use instead of the parser's.")
+    dump_cli.add_argument('--path', default='', help='Sub-command to extract.')
+    dump_cli.add_argument(
+        '--passparser', action='store_true', help='The factory fills in a given parser.'
+    )
+    dump_cli.add_argument(
+        '--static',
+        action='store_true',
+        help='Read --filename without executing it, if possible.',
+    )
+    dump_cli.add_argument('--nodefault', action='store_true', help='Leave out default values.')
+    dump_cli.add_argument(
+        '--nodefaultconst',
+        action='store_true',
+        help='Leave out default values of store_const, store_true and store_false arguments.',
+    )
+    dump_cli.add_argument('--color', action='store_true', help='Keep argparse colors.')
+    dump_cli.add_argument(
+        '--formatter-width', type=int, help='Wrap usage at this width, not the terminal width.'
+    )
+    dump_cli.add_argument(
+        '--mock-import',
+        action='append',
+        default=[],
+        metavar='MODULE',
+        help='Mock this module while importing, like autodoc_mock_imports.',
+    )
+    dump_cli.add_argument(
+        '-o', '--output', default='-', help='Output file (default: standard output).'
+    )
+    dump_cli.set_defaults(handler=dump)
+
+    args = cli.parse_args(argv)
+    args.mock_import = tuple(args.mock_import)
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import pickle
+import sys
+import sysconfig
+from collections import OrderedDict
+from importlib.machinery import PathFinder
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from sphinxarg import __version__
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Iterable
+    from typing import Any
+
+    from docutils.nodes import Node
+
+
+class ParserCache:
+    """In-memory cache of :func:`~sphinxarg.parser.parse_parser` results.
+
+    Directives documenting the same parser with the same extraction options
+    share one entry, so each parser tree is extracted once per build.
+    Cached results are shared between directives and must not be modified.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[Hashable, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached result for *key*, or ``None`` on a miss."""
+        try:
+            result = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def peek(self, key: Hashable) -> Any:
+        """Like :meth:`get`, but without counting the lookup."""
+        return self._entries.get(key)
+
+    def set(self, key: Hashable, result: Any) -> None:
+        self._entries[key] = result
+
+    def clear(self) -> None:
+        """Drop all entries and reset the hit/miss counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class DiskCache:
+    """On-disk cache of pickled parser trees, keyed by a fingerprint.
+
+    The cache is disabled until :meth:`configure` is given a directory.
+    Entries are written atomically; when the directory grows beyond
+    ``max_size`` bytes the least recently used entries are removed.
+    An entry may record the digests of further files it depends on, it is a
+    miss once any of them changes.
+    """
+
+    suffix = '.pickle'
+
+    def __init__(self) -> None:
+        self.directory: Path | None = None
+        self.max_size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def configure(self, directory: Path | None, max_size: int = 0) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, fingerprint: str) -> Path:
+        assert self.directory is not None
+        return self.directory / f'{fingerprint}{self.suffix}'
+
+    def get(self, fingerprint: str) -> Any:
+        """Return the entry stored under *fingerprint*, or ``None`` on a miss."""
+        path = self._entry_path(fingerprint)
+        try:
+            with open(path, 'rb') as f:
+                dependencies, result = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # A truncated or incompatible entry is as good as a missing one
+            self.misses += 1
+            path.unlink(missing_ok=True)
+            return None
+        if any(file_digest(file) != digest for file, digest in dependencies.items()):
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Mark the entry as recently used for eviction
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return result
+
+    def set(self, fingerprint: str, result: Any, dependencies: Iterable[str] = ()) -> bool:
+        """Store *result*, return whether it could be serialized and written.
+
+        *result* depends on the current contents of the *dependencies* files.
+        """
+        assert self.directory is not None
+        digests = {file: file_digest(file) for file in dependencies}
+        try:
+            data = pickle.dumps((digests, result), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # Defaults or choices may hold objects that cannot be pickled
+            return False
+        path = self._entry_path(fingerprint)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            return False
+        self.evict()
+        return True
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the size cap is met."""
+        assert self.directory is not None
+        entries = []
+        total = 0
+        for path in self.directory.glob(f'*{self.suffix}'):
+            with contextlib.suppress(OSError):
+                stat = path.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+class FragmentCache:
+    """Bounded LRU cache of the nodes rendered from help texts.
+
+    Entries are keyed by the text and what else its rendering depends on.
+    Nodes are copied when they are stored and when they are returned, so
+    callers may modify them.  The cache is disabled until :meth:`configure` is
+    given a size.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[Hashable, list[Node]] = OrderedDict()
+        self.max_size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def configure(self, max_size: int) -> None:
+        """Keep up to *max_size* entries, and drop the current ones."""
+        self.max_size = max_size
+        self.clear()
+
+    def get(self, key: Hashable) -> list[Node] | None:
+        """Return copies of the nodes cached for *key*, or ``None`` on a miss."""
+        try:
+            children = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return [_copy(node) for node in children]
+
+    def set(self, key: Hashable, children: Iterable[Node]) -> None:
+        self._entries[key] = [_copy(node) for node in children]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries and reset the hit/miss counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def _copy(node: Node) -> Node:
+    """Return a deep copy of *node*, with the source and line of every node."""
+    # Copies of child nodes take the source and line of the document otherwise
+    copy = node.deepcopy()
+    for original, copied in zip(node.findall(), copy.findall(), strict=True):
+        copied.source, copied.line = original.source, original.line
+    return copy
+
+
+def module_source_files(module_name: str) -> list[str] | None:
+    """Return the source files of *module_name* and its outermost package.
+
+    That is the files of the module and its parent packages, then every Python
+    file under the outermost regular package, whose other modules may define
+    part of the parser.  The module is located without importing it.  ``None``
+    is returned when the module cannot be found through the regular path based
+    finder.
+    """
+    files = []
+    package_dirs: list[str] = []
+    search_path = None
+    parts = module_name.split('.')
+    for i in range(len(parts)):
+        spec = PathFinder.find_spec('.'.join(parts[: i + 1]), search_path)
+        if spec is None:
+            return None
+        if spec.has_location and spec.origin:
+            files.append(spec.origin)
+        search_path = spec.submodule_search_locations
+        if not package_dirs and spec.has_location and search_path is not None:
+            package_dirs = list(search_path)
+    for directory in package_dirs:
+        for root, dirs, names in os.walk(directory):
+            dirs[:] = sorted(name for name in dirs if name != '__pycache__')
+            files.extend(
+                os.path.join(root, name) for name in sorted(names) if name.endswith('.py')
+            )
+    return list(dict.fromkeys(files))
+
+
+#: Directories of the standard library and installed distributions
+_INSTALLED_PATHS = tuple({
+    os.path.join(os.path.realpath(sysconfig.get_path(name)), '')
+    for name in ('stdlib', 'platstdlib', 'purelib', 'platlib')
+})
+
+
+def imported_source_files(module_names: Iterable[str]) -> list[str]:
+    """Return the files of the imported modules *module_names*.
+
+    Modules without a file, like mock modules, and those of the standard
+    library and installed distributions are left out.
+    """
+    files = []
+    for name in sorted(module_names):
+        file = getattr(sys.modules.get(name), '__file__', None)
+        if (
+            isinstance(file, str)
+            and os.path.isfile(file)
+            and not os.path.realpath(file).startswith(_INSTALLED_PATHS)
+        ):
+            files.append(file)
+    return files
+
+
+#: Digests of file contents, by file name, modification time and size
+_file_digests: dict[tuple[str, int, int], str] = {}
+
+
+def file_digest(file: str) -> str | None:
+    """Return the SHA-256 digest of the contents of *file*, ``None`` if it cannot be read.
+
+    The file is read again only when its modification time or size changes.
+    """
+    try:
+        stat = os.stat(file)
+        key = (file, stat.st_mtime_ns, stat.st_size)
+        digest = _file_digests.get(key)
+        if digest is None:
+            digest = _file_digests[key] = hashlib.sha256(Path(file).read_bytes()).hexdigest()
+    except OSError:
+        return None
+    return digest
+
+
+def fingerprint(key: Hashable, source_files: Iterable[str]) -> str | None:
+    """Return a digest of the extraction options and the source file contents."""
+    digest = hashlib.sha256()
+    digest.update(f'{__version__}\0{sys.version}\0{key!r}'.encode())
+    for file in source_files:
+        content_digest = file_digest(file)
+        if content_digest is None:
+            return None
+        digest.update(f'\0{file}\0{content_digest}'.encode())
+    return digest.hexdigest()
+
+
+#: The cache used by the ``argparse`` directive, reset when a build starts.
+parser_cache = ParserCache()
+
+#: The rendered help texts of the ``argparse`` directive, if enabled.
+fragment_cache = FragmentCache()
+
+#: The persistent cache used by the ``argparse`` directive, if enabled.
+disk_cache = DiskCache()
+
+#: The last tree extracted for each directive key, whatever the source files,
+#: used when loading a parser times out.  Enabled with a factory timeout.
+last_good_cache = DiskCache()
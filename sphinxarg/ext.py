@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-import importlib
+import cProfile
 import operator
 import os
-import sys
-from argparse import ArgumentParser
+import re
+import shutil
+import time
+from pathlib import Path
 from typing import TYPE_CHECKING, cast
 
 from docutils import nodes
@@ -12,6 +14,7 @@ from docutils.frontend import get_default_settings
 from docutils.parsers.rst import Parser
 from docutils.parsers.rst.directives import flag, unchanged
 from docutils.statemachine import StringList
+from docutils.utils import Reporter
 from sphinx.domains import Domain, Index, IndexEntry
 from sphinx.errors import ExtensionError
 from sphinx.roles import XRefRole
@@ -19,19 +22,33 @@ from sphinx.util import logging
 from sphinx.util.docutils import SphinxDirective, new_document
 from sphinx.util.nodes import make_id, make_refnode, nested_parse_with_titles
 
-try:
-    from sphinx.ext.autodoc.mock import mock
-except ImportError:
-    from sphinx.ext.autodoc import mock
-    # A persistent bug in sphinx / autodoc causes problems during importing (#82)
-
 from sphinxarg import __version__
-from sphinxarg.parser import parse_parser, parser_navigate
+from sphinxarg.cache import (
+    disk_cache,
+    fingerprint,
+    fragment_cache,
+    imported_source_files,
+    last_good_cache,
+    module_source_files,
+    parser_cache,
+)
+from sphinxarg.loader import (
+    FactoryNotFoundError,
+    ParserSource,
+    _LoadTimeoutError,
+    call_factory,
+    call_with_timeout,
+    loader_session,
+)
+from sphinxarg.parallel import extract_isolated, shutdown_executor, subtree_submitter
+from sphinxarg.parser import parse_parser_path, parser_navigate
+from sphinxarg.snapshot import load_snapshot
+from sphinxarg.static import DynamicCodeException, load_static
+from sphinxarg.timing import NO_TIMING, DirectiveTiming, summarize, write_report
 from sphinxarg.utils import command_pos_args, target_to_anchor_id
 
 if TYPE_CHECKING:
     from collections.abc import Iterable, Sequence
-    from pathlib import Path
 
     from docutils.nodes import Element
     from sphinx.addnodes import pending_xref
@@ -96,20 +113,302 @@ def render_list(l, markdown_help, settings=None):
     if markdown_help:
         from sphinxarg.markdown import parse_markdown_block
 
-        return parse_markdown_block('\n\n'.join(l) + '\n')
+        text = '\n\n'.join(l) + '\n'
+        if not fragment_cache.enabled:
+            return parse_markdown_block(text)
+        key = _fragment_key(text, markdown_help, settings)
+        children = fragment_cache.get(key)
+        if children is None:
+            children = parse_markdown_block(text)
+            if _is_cacheable(text, children):
+                fragment_cache.set(key, children)
+        return children
     else:
-        if settings is None:
-            settings = get_default_settings(Parser)
+        return render_lists([l], markdown_help, settings)[0]
+
+
+def render_lists(lists, markdown_help, settings=None):
+    """
+    Return ``[render_list(l, markdown_help, settings) for l in lists]``, parsing the
+    reStructuredText sections of all lists in one go where possible.
+    """
+    if markdown_help:
+        return [render_list(l, markdown_help, settings) for l in lists]
+    if settings is None:
+        settings = get_default_settings(Parser)
+    parsed = iter(
+        _parse_fragments(
+            [element for l in lists for element in l if isinstance(element, str)], settings
+        )
+    )
+    rendered = []
+    for l in lists:
         all_children = []
         for element in l:
             if isinstance(element, str):
-                document = new_document('', settings)
-                Parser().parse(element + '\n', document)
-                all_children += document.children
+                all_children += next(parsed)
             elif isinstance(element, nodes.definition):
                 all_children += element
+        rendered.append(all_children)
+    return rendered
+
+
+#: Transition separating the fragments of a batch.  Unlike a comment, a
+#: transition doesn't start a nested state machine, which costs about as much as
+#: parsing a fragment on its own.
+_FRAGMENT_BREAK = '~' * 19
+
+#: Document attributes that parsing plain fragments leaves empty.  Anything
+#: registered there (targets, ids, footnotes, substitutions, pending transforms)
+#: could depend on the other fragments of a batch.
+_DOCUMENT_REGISTRIES = (
+    'ids',
+    'nameids',
+    'refnames',
+    'refids',
+    'indirect_targets',
+    'substitution_defs',
+    'substitution_names',
+    'autofootnotes',
+    'autofootnote_refs',
+    'symbol_footnotes',
+    'symbol_footnote_refs',
+    'footnotes',
+    'footnote_refs',
+    'citations',
+    'citation_refs',
+    'parse_messages',
+)
+
+
+def _parse_fragment(text, settings):
+    document = new_document('', settings)
+    Parser().parse(text + '\n', document)
+    return document.children
+
+
+#: Settings that change how a help text is parsed
+_FRAGMENT_SETTINGS = (
+    'tab_width',
+    'pep_references',
+    'pep_base_url',
+    'rfc_references',
+    'rfc_base_url',
+    'trim_footnote_reference_space',
+    'character_level_inline_markup',
+    'syntax_highlight',
+    'raw_enabled',
+    'file_insertion_enabled',
+    'language_code',
+)
+
+#: A line starting explicit markup: directives, targets, footnotes and comments
+_EXPLICIT_MARKUP = re.compile(r'^\s*\.\.(\s|$)', re.MULTILINE)
+
+
+def _fragment_key(text, markdown_help, settings):
+    """Return the key of the nodes of *text* in the fragment cache."""
+    options = tuple(getattr(settings, name, None) for name in _FRAGMENT_SETTINGS)
+    env = getattr(settings, 'env', None)
+    if env is None:
+        return text, markdown_help, options
+    # Roles like :doc: resolve relative to the current document, and :func: or
+    # :option: to the current module or program
+    return (
+        text,
+        markdown_help,
+        options,
+        env.docname,
+        env.temp_data.get('default_role'),
+        # Nested Python objects keep lists of their enclosing classes and modules
+        tuple(
+            (name, tuple(value) if isinstance(value, list) else value)
+            for name, value in sorted(env.ref_context.items())
+        ),
+    )
+
+
+def _is_cacheable(text, children):
+    """
+    Return whether the nodes of *text* can be reused for another occurrence.
+
+    Directives may have side effects and nodes with ids must stay unique, and
+    warnings should be reported for every occurrence of a text.
+    """
+    if _EXPLICIT_MARKUP.search(text):
+        return False
+    return not any(
+        isinstance(node, nodes.system_message) or node['ids']
+        for child in children
+        for node in child.findall(nodes.Element)
+    )
 
-        return all_children
+
+#: Characters and sequences that may be inline markup or that docutils
+#: converts: backticks, asterisks, substitutions, escapes, e-mail addresses,
+#: roles, field lists and URIs (a colon followed by anything but a space),
+#: references and targets (an underscore anywhere but inside a word), PEP and
+#: RFC references, tabs and other control characters
+_INLINE_MARKUP = re.compile(
+    r'[`*|\\@\x00-\x09\x0b-\x1f\x85\u2028\u2029]'
+    r'|:(?=\S)'
+    r'|(?<![^\W_])_|_(?![^\W_])'
+    r'|(?i:pep|rfc)'
+)
+
+#: Lines that may start a construct other than a paragraph: indented lines
+#: (block quotes, definitions), bullets, options, field lists, explicit markup,
+#: doctests, enumerators, and lines without letters or digits (titles,
+#: transitions, tables)
+_BLOCK_MARKUP = re.compile(
+    r'^(?:[^\S\n]|[-+*\u2022\u2023\u2043/:.>]|\(?[\w#]+[.)](?:\s|$)|[^\w\s][^\w\n]*$)',
+    re.MULTILINE,
+)
+
+
+def _plain_paragraphs(text):
+    """
+    Return the paragraphs of *text* like `_parse_fragment` does, or ``None`` if the
+    text may hold any markup.
+    """
+    if _INLINE_MARKUP.search(text) or _BLOCK_MARKUP.search(text):
+        return None
+    paragraphs = []
+    block = []
+    for lineno, line in enumerate(text.split('\n'), 1):
+        line = line.rstrip()
+        if line:
+            if not block:
+                first_line = lineno
+            block.append(line)
+        elif block:
+            paragraphs.append(_paragraph(block, first_line))
+            block = []
+    if block:
+        paragraphs.append(_paragraph(block, first_line))
+    return paragraphs
+
+
+def _paragraph(lines, lineno):
+    text = '\n'.join(lines)
+    paragraph = nodes.paragraph(text, '', nodes.Text(text))
+    paragraph.source, paragraph.line = '', lineno
+    return paragraph
+
+
+def _parse_fragments(texts, settings):
+    """Return the nodes of every text in *texts*, parsed as a document of its own."""
+    # Plain text is turned into paragraphs directly, which is cheaper than
+    # copying cached nodes
+    results = [_plain_paragraphs(text) for text in texts]
+    missing = [i for i, children in enumerate(results) if children is None]
+    if not fragment_cache.enabled:
+        _fill(results, missing, texts, settings)
+        return results
+
+    keys = {i: _fragment_key(texts[i], False, settings) for i in missing}
+    seen = set()
+    repeated = []
+    for i in missing:
+        if keys[i] in seen:
+            repeated.append(i)
+        else:
+            seen.add(keys[i])
+            results[i] = fragment_cache.get(keys[i])
+    _fill(results, [i for i in missing if results[i] is None], texts, settings, keys)
+    # Texts repeated in *texts* are copied from their first occurrence
+    for i in repeated:
+        results[i] = fragment_cache.get(keys[i])
+    _fill(results, [i for i in repeated if results[i] is None], texts, settings)
+    return results
+
+
+def _fill(results, indices, texts, settings, keys=None):
+    """Parse the texts at *indices* into *results*, and cache them under *keys*."""
+    parsed = _parse_uncached([texts[i] for i in indices], settings)
+    for i, children in zip(indices, parsed, strict=True):
+        results[i] = children
+        if keys is not None and _is_cacheable(texts[i], children):
+            fragment_cache.set(keys[i], children)
+
+
+def _parse_uncached(texts, settings):
+    # Directives and roles may have side effects, like recording a change or
+    # numbering index entries, which must happen once for each text: those
+    # texts are kept out of batches, as a batch may be discarded
+    batched = [i for i, text in enumerate(texts) if not _has_side_effects(text)]
+    results = [None] * len(texts)
+    if len(batched) > 1:
+        batch = _parse_batch([texts[i] for i in batched], settings)
+        if batch is not None:
+            for i, children in zip(batched, batch, strict=True):
+                results[i] = children
+    return [
+        _parse_fragment(text, settings) if children is None else children
+        for text, children in zip(texts, results, strict=True)
+    ]
+
+
+#: Interpreted text, which may use any role: a backtick that isn't part of a
+#: double backtick
+_INTERPRETED_TEXT = re.compile(r'(?<!`)`(?!`)')
+
+
+def _has_side_effects(text):
+    """Return whether parsing *text* may run directives or roles."""
+    return bool(_EXPLICIT_MARKUP.search(text) or _INTERPRETED_TEXT.search(text))
+
+
+def _parse_batch(texts, settings):
+    """
+    Parse *texts* as one document, separated by transitions, and split the result.
+
+    Return the same nodes as `_parse_fragment` for each text, or ``None`` if the
+    texts may not be parsed independently of each other: a text that holds
+    sections or transitions, defines targets or ids, or produces any system
+    message.  Messages are not reported here, they will be when the
+    texts are parsed one by one.  The texts must not run directives or roles.
+    """
+    separator = f'\n{_FRAGMENT_BREAK}\n\n'
+    quiet = Reporter('', Reporter.SEVERE_LEVEL + 1, Reporter.SEVERE_LEVEL + 1, stream=False)
+    document = nodes.document(settings, quiet, source='')
+    document.note_source('', -1)
+    Parser().parse(separator.join(text + '\n' for text in texts), document)
+
+    if any(getattr(document, name) for name in _DOCUMENT_REGISTRIES):
+        return None
+    if document.transformer.transforms or next(document.findall(nodes.system_message), None):
+        return None
+    breaks = list(document.findall(nodes.transition))
+    if len(breaks) != len(texts) - 1 or any(
+        node.parent is not document or node.rawsource != _FRAGMENT_BREAK for node in breaks
+    ):
+        return None
+
+    fragments = [[]]
+    for node in document.children:
+        if isinstance(node, nodes.transition):
+            fragments.append([])
+        else:
+            fragments[-1].append(node)
+    # Number lines from the start of each text, like separate documents do
+    offset = 0
+    separator_lines = separator.count('\n')
+    for text, fragment in zip(texts, fragments, strict=True):
+        if offset:
+            for node in fragment:
+                for child in node.findall():
+                    if child.line is not None:
+                        child.line -= offset
+        offset += text.count('\n') + 1 + separator_lines
+    # The raw source of blocks ending a text, like the last item of a list, holds
+    # the blank line before the next break
+    for fragment in fragments[:-1]:
+        node = fragment[-1] if fragment else None
+        while isinstance(node, nodes.Element):
+            node.rawsource = node.rawsource.removesuffix('\n')
+            node = node.children[-1] if node.children else None
+    return fragments
 
 
 def _is_suppressed(item: str | None) -> bool:
@@ -171,7 +470,8 @@ def print_action_groups(
                 for k, v in map_nested_definitions(subcontent).items():
                     local_definitions[k] = v
 
-            items = []
+            terms = []
+            descs = []
             # Iterate over action group members
             for entry in action_group['options']:
                 # Members will include:
@@ -205,80 +505,133 @@ def print_action_groups(
                         desc.append(s)
                     elif classifier == '@before':
                         desc.insert(0, s)
-                term = ', '.join(entry['name'])
+                terms.append(', '.join(entry['name']))
+                descs.append(desc)
 
-                n = nodes.option_list_item(
+            # The descriptions of a group are parsed together
+            items = [
+                nodes.option_list_item(
                     '',
                     nodes.option_group('', nodes.option_string(text=term)),
-                    nodes.description('', *render_list(desc, markdown_help, settings)),
+                    nodes.description('', *rendered),
                 )
-                items.append(n)
-
+                for term, rendered in zip(
+                    terms, render_lists(descs, markdown_help, settings), strict=True
+                )
+            ]
             section += nodes.option_list('', *items)
             nodes_list.append(section)
 
     return nodes_list
 
 
-def print_subcommands(data, nested_content, markdown_help=False, settings=None):  # noqa: N803
+def _subcommand_description(child, definitions):
+    """Return the description of a subcommand and its nested content."""
+    if 'description' in child and child['description']:
+        desc = [child['description']]
+    elif child['help']:
+        desc = [child['help']]
+    else:
+        desc = ['Undocumented']
+
+    # Handle nested content
+    subcontent = []
+    if child['name'] in definitions:
+        classifier, s, subcontent = definitions[child['name']]
+        if classifier == '@replace':
+            desc = [s]
+        elif classifier == '@after':
+            desc.append(s)
+        elif classifier == '@before':
+            desc.insert(0, s)
+    return desc, subcontent
+
+
+def _build_subcommand_sections(
+    data, nested_content, open_child, close_child, open_children=None
+):
     """
-    Each subcommand is a dictionary with the following keys:
+    Build the nested 'Sub-commands' sections for the subcommands of data.
 
-    ['usage', 'action_groups', 'bare_usage', 'name', 'help']
+    The subcommand tree is walked with an explicit stack, so its depth is not
+    limited by the interpreter's recursion limit. The sections are produced in
+    the same order as a recursive walk would:
 
-    In essence, this is all tossed in a new section with the title 'name'.
-    Apparently there can also be a 'description' entry.
+    - open_children(data) is called for every parser with subcommands,
+    - open_child(child, definitions, nested_content) returns the section for a
+      subcommand and the nested content for its own subcommands,
+    - close_child(child, section) completes the section after the sections of
+      its own subcommands have been added.
     """
-
-    definitions = map_nested_definitions(nested_content)
     items = []
-    if 'children' in data:
+
+    def enter(data, nested_content, output):
+        definitions = map_nested_definitions(nested_content)
+        if 'children' not in data:
+            return None
+        if open_children is not None:
+            open_children(data)
         subcommands = nodes.section(ids=['Sub-commands'])
         subcommands += nodes.title('Sub-commands', 'Sub-commands')
+        return [definitions, nested_content, iter(data['children']), subcommands, output, None]
+
+    frame = enter(data, nested_content, items)
+    stack = [frame] if frame is not None else []
+    while stack:
+        frame = stack[-1]
+        definitions, nested_content, children, subcommands, output, pending = frame
+        if pending is not None:
+            # The sections of the pending child's own subcommands are complete
+            child, sec = pending
+            close_child(child, sec)
+            subcommands += sec
+            frame[5] = None
 
-        for child in data['children']:
-            sec = nodes.section(ids=[child['name']])
-            sec += nodes.title(child['name'], child['name'])
+        child = next(children, None)
+        if child is None:
+            output.append(subcommands)
+            stack.pop()
+            continue
 
-            if 'description' in child and child['description']:
-                desc = [child['description']]
-            elif child['help']:
-                desc = [child['help']]
-            else:
-                desc = ['Undocumented']
+        sec, child_nested_content = open_child(child, definitions, nested_content)
+        frame[5] = (child, sec)
+        child_frame = enter(child, child_nested_content, sec)
+        if child_frame is not None:
+            stack.append(child_frame)
 
-            # Handle nested content
-            subcontent = []
-            if child['name'] in definitions:
-                classifier, s, subcontent = definitions[child['name']]
-                if classifier == '@replace':
-                    desc = [s]
-                elif classifier == '@after':
-                    desc.append(s)
-                elif classifier == '@before':
-                    desc.insert(0, s)
+    return items
 
-            for element in render_list(desc, markdown_help):
-                sec += element
-            sec += nodes.literal_block(text=child['bare_usage'])
-            for x in print_action_groups(
-                child, nested_content + subcontent, markdown_help, settings=settings
-            ):
-                sec += x
 
-            for x in print_subcommands(
-                child, nested_content + subcontent, markdown_help, settings=settings
-            ):
-                sec += x
+def print_subcommands(data, nested_content, markdown_help=False, settings=None):  # noqa: N803
+    """
+    Each subcommand is a dictionary with the following keys:
 
-            if 'epilog' in child and child['epilog']:
-                for element in render_list([child['epilog']], markdown_help):
-                    sec += element
+    ['usage', 'action_groups', 'bare_usage', 'name', 'help']
 
-            subcommands += sec
-        items.append(subcommands)
+    In essence, this is all tossed in a new section with the title 'name'.
+    Apparently there can also be a 'description' entry.
+    """
 
-    return items
+    def open_child(child, definitions, nested_content):
+        sec = nodes.section(ids=[child['name']])
+        sec += nodes.title(child['name'], child['name'])
+
+        desc, subcontent = _subcommand_description(child, definitions)
+        for element in render_list(desc, markdown_help):
+            sec += element
+        sec += nodes.literal_block(text=child['bare_usage'])
+        for x in print_action_groups(
+            child, nested_content + subcontent, markdown_help, settings=settings
+        ):
+            sec += x
+        return sec, nested_content + subcontent
+
+    def close_child(child, sec):
+        if 'epilog' in child and child['epilog']:
+            for element in render_list([child['epilog']], markdown_help):
+                sec += element
+
+    return _build_subcommand_sections(data, nested_content, open_child, close_child)
 
 
 def ensure_unique_ids(items):
@@ -290,22 +643,44 @@ def ensure_unique_ids(items):
     so that the links are then unique.
     """
     s = set()
+    # The lowest free repeat number of an ID never decreases, so the search
+    # continues where the previous one for the same ID stopped
+    next_repeat = {}
     for item in items:
-        for n in item.findall(descend=True, siblings=True, ascend=False):
+        for n in _iter_following_nodes(item):
             if isinstance(n, nodes.section):
                 ids = n['ids']
                 for idx, id in enumerate(ids):
                     if id not in s:
                         s.add(id)
                     else:
-                        i = 1
+                        i = next_repeat.get(id, 1)
                         while f'{id}_repeat{i}' in s:
                             i += 1
+                        next_repeat[id] = i
                         ids[idx] = f'{id}_repeat{i}'
                         s.add(ids[idx])
                 n['ids'] = ids
 
 
+def _iter_following_nodes(node):
+    """
+    Yield node, its following siblings and all of their descendants in document
+    order, like node.findall(siblings=True), but without recursion.
+    """
+    roots = [node]
+    if node.parent is not None:
+        siblings = node.parent.children
+        index = next(i for i, sibling in enumerate(siblings) if sibling is node)
+        roots.extend(siblings[index + 1 :])
+    for root in roots:
+        stack = [root]
+        while stack:
+            n = stack.pop()
+            yield n
+            stack.extend(reversed(n.children))
+
+
 class ArgParseDirective(SphinxDirective):
     has_content = True
     required_arguments = 0
@@ -327,8 +702,11 @@ class ArgParseDirective(SphinxDirective):
         'markdownhelp': flag,
         'color': flag,
         'index-groups': unchanged,
+        'snapshot': unchanged,
+        'static': flag,
     }
     index_groups: Sequence[str] = ()
+    _timing = NO_TIMING
 
     def _construct_manpage_specific_structure(self, parser_info):
         """
@@ -413,7 +791,7 @@ class ArgParseDirective(SphinxDirective):
             debug_section = nodes.section(
                 '',
                 nodes.title(text='Argparse + Sphinx Debugging'),
-                nodes.literal_block(text=json.dumps(parser_info, indent='  ')),
+                nodes.literal_block(text=json.dumps(parser_info.to_dict(), indent='  ')),
                 ids=['debug-section'],
             )
             items.append(debug_section)
@@ -504,8 +882,8 @@ class ArgParseDirective(SphinxDirective):
         """
         return self.env.srcdir
 
-    def _open_filename(self):
-        file = self.options['filename']
+    def _resolve_filename(self, option='filename'):
+        file = self.options[option]
 
         # If the provided path is not absolute, we consider it relative to the docs
         # conf dir:
@@ -513,16 +891,7 @@ class ArgParseDirective(SphinxDirective):
             file = os.path.realpath(
                 os.path.join(self._srcdir, file)
             )  # Resolve things like ".." to make clear where we're searching
-
-        # try open with given path
-        try:
-            return open(file)
-        except OSError:
-            msg = (
-                f'Failed to find provided source file `{self.options["filename"]}` '
-                f'(resolved to `{file}`)'
-            )
-            raise FileNotFoundError(msg) from None
+        return file
 
     def _print_subcommands(self, data, nested_content, markdown_help=False, settings=None):
         """
@@ -534,12 +903,10 @@ class ArgParseDirective(SphinxDirective):
         Apparently there can also be a 'description' entry.
         """
 
-        definitions = map_nested_definitions(nested_content)
-        items = []
         full_subcommand_name_true = self.config.sphinxarg_full_subcommand_name
         domain = cast('ArgParseDomain', self.env.domains[ArgParseDomain.name])
 
-        if 'children' in data:
+        def open_children(data):
             full_command = command_pos_args(data)
             node_id = make_id(
                 self.env, self.state.document, '', full_command + '-sub-commands'
@@ -548,64 +915,41 @@ class ArgParseDirective(SphinxDirective):
             self.set_source_info(target)
             self.state.document.note_explicit_target(target)
 
-            subcommands = nodes.section(ids=['Sub-commands'])
-            subcommands += nodes.title('Sub-commands', 'Sub-commands')
-
-            for child in data['children']:
-                full_command = command_pos_args(child)
-                node_id = make_id(self.env, self.state.document, '', full_command)
-                target = nodes.target('', '', ids=[node_id])
-                self.set_source_info(target)
-                self.state.document.note_explicit_target(target)
+        def open_child(child, definitions, nested_content):
+            full_command = command_pos_args(child)
+            node_id = make_id(self.env, self.state.document, '', full_command)
+            target = nodes.target('', '', ids=[node_id])
+            self.set_source_info(target)
+            self.state.document.note_explicit_target(target)
 
-                sec = nodes.section(ids=[node_id, child['name']])
-                if full_subcommand_name_true:
-                    title = nodes.title(full_command, full_command)
-                else:
-                    title = nodes.title(child['name'], child['name'])
-                sec += title
+            sec = nodes.section(ids=[node_id, child['name']])
+            if full_subcommand_name_true:
+                title = nodes.title(full_command, full_command)
+            else:
+                title = nodes.title(child['name'], child['name'])
+            sec += title
 
+            with self._timing.phase('domain'):
                 domain.add_argparse_command(child, node_id, self.index_groups)
 
-                if 'description' in child and child['description']:
-                    desc = [child['description']]
-                elif child['help']:
-                    desc = [child['help']]
-                else:
-                    desc = ['Undocumented']
-
-                # Handle nested content
-                subcontent = []
-                if child['name'] in definitions:
-                    classifier, s, subcontent = definitions[child['name']]
-                    if classifier == '@replace':
-                        desc = [s]
-                    elif classifier == '@after':
-                        desc.append(s)
-                    elif classifier == '@before':
-                        desc.insert(0, s)
+            desc, subcontent = _subcommand_description(child, definitions)
+            for element in render_list(desc, markdown_help):
+                sec += element
+            sec += nodes.literal_block(text=child['bare_usage'])
+            for x in self._print_action_groups(
+                child, nested_content + subcontent, markdown_help, settings=settings
+            ):
+                sec += x
+            return sec, nested_content + subcontent
 
-                for element in render_list(desc, markdown_help):
+        def close_child(child, sec):
+            if 'epilog' in child and child['epilog']:
+                for element in render_list([child['epilog']], markdown_help):
                     sec += element
-                sec += nodes.literal_block(text=child['bare_usage'])
-                for x in self._print_action_groups(
-                    child, nested_content + subcontent, markdown_help, settings=settings
-                ):
-                    sec += x
-
-                for x in self._print_subcommands(
-                    child, nested_content + subcontent, markdown_help, settings=settings
-                ):
-                    sec += x
-
-                if 'epilog' in child and child['epilog']:
-                    for element in render_list([child['epilog']], markdown_help):
-                        sec += element
-
-                subcommands += sec
-            items.append(subcommands)
 
-        return items
+        return _build_subcommand_sections(
+            data, nested_content, open_child, close_child, open_children
+        )
 
     def _print_action_groups(
         self,
@@ -668,7 +1012,8 @@ class ArgParseDirective(SphinxDirective):
                     for k, v in map_nested_definitions(subcontent).items():
                         local_definitions[k] = v
 
-                items = []
+                terms = []
+                descs = []
                 # Iterate over action group members
                 for entry in action_group['options']:
                     # Members will include:
@@ -702,15 +1047,20 @@ class ArgParseDirective(SphinxDirective):
                             desc.append(s)
                         elif classifier == '@before':
                             desc.insert(0, s)
-                    term = ', '.join(entry['name'])
+                    terms.append(', '.join(entry['name']))
+                    descs.append(desc)
 
-                    n = nodes.option_list_item(
+                # The descriptions of a group are parsed together
+                items = [
+                    nodes.option_list_item(
                         '',
                         nodes.option_group('', nodes.option_string(text=term)),
-                        nodes.description('', *render_list(desc, markdown_help, settings)),
+                        nodes.description('', *rendered),
                     )
-                    items.append(n)
-
+                    for term, rendered in zip(
+                        terms, render_lists(descs, markdown_help, settings), strict=True
+                    )
+                ]
                 section += nodes.option_list('', *items)
                 nodes_list.append(section)
 
@@ -724,8 +1074,276 @@ class ArgParseDirective(SphinxDirective):
         item = str(item).replace('"', '').replace("'", '')
         return item == '==SUPPRESS=='
 
+    def _parser_cache_key(self, module_name, attr_name, path):
+        """Return the key identifying this directive's extracted parser tree.
+
+        Everything that changes the output of ``parse_parser_path`` is part of
+        the key, the ``:path:`` option comes last.
+        """
+        if 'snapshot' in self.options:
+            # The extraction options were applied when the snapshot was made
+            return ('snapshot', self._resolve_filename('snapshot'), path)
+        if 'filename' in self.options:
+            source = ('filename', self._resolve_filename())
+        else:
+            source = ('module', module_name)
+        return (
+            *source,
+            attr_name,
+            'passparser' in self.options,
+            self.options.get('prog'),
+            'nodefault' in self.options,
+            'nodefaultconst' in self.options,
+            'color' in self.options,
+            self.config.sphinxarg_formatter_width,
+            path,
+        )
+
+    def _parser_source(self, module_name, attr_name):
+        """Return the picklable :class:`~sphinxarg.loader.ParserSource` of the parser."""
+        if 'filename' in self.options:
+            kind, location = 'filename', self._resolve_filename()
+        else:
+            kind, location = 'module', module_name
+        return ParserSource(
+            kind,
+            location,
+            attr_name,
+            passparser='passparser' in self.options,
+            mock_imports=tuple(self.config.autodoc_mock_imports),
+            display_name=self.options.get('filename'),
+            static='static' in self.options,
+        )
+
+    def _load_parser(self, source):
+        """Return the parser of *source*, loading it once per build."""
+        parser = loader_session.parsers.get(source)
+        if parser is None:
+            parser = loader_session.parsers[source] = self._import_parser(source)
+        return parser
+
+    def _import_parser(self, source):
+        """Import or execute the configured source and return its parser."""
+        if source.kind == 'filename':
+            try:
+                if source.static:
+                    try:
+                        with self._timing.phase('factory'):
+                            return load_static(
+                                source.location,
+                                source.attr_name,
+                                source.passparser,
+                                source.display_name,
+                            )
+                    except DynamicCodeException as exc:
+                        logger.verbose(
+                            '[sphinxarg] executing %s, it cannot be read statically: %s',
+                            source.display_name,
+                            exc,
+                        )
+                with self._timing.phase('import'):
+                    func = loader_session.exec_factory(
+                        source.location, source.attr_name, source.display_name
+                    )
+            except OSError:
+                msg = (
+                    f'Failed to find provided source file `{source.display_name}` '
+                    f'(resolved to `{source.location}`)'
+                )
+                raise FileNotFoundError(msg) from None
+        else:
+            module_name, attr_name = source.location, source.attr_name
+            try:
+                with self._timing.phase('import'):
+                    func = loader_session.import_factory(
+                        module_name, attr_name, source.mock_imports
+                    )
+            except ImportError as exc:
+                msg = f'Failed to import "{attr_name}" from "{module_name}".\n{exc}'
+                raise self.error(msg) from exc
+            if func is None:
+                msg = (
+                    f'Module "{module_name}" has no attribute "{attr_name}"\n'
+                    f'Incorrect argparse :module: or :func: values?'
+                )
+                raise self.error(msg)
+        with self._timing.phase('factory'):
+            return call_factory(func, source.passparser)
+
+    def _extract_isolated(self, source, path, timeout, kwargs):
+        """Return the parser tree extracted by a worker process."""
+        workers = self.config.sphinxarg_extraction_processes
+        try:
+            return extract_isolated(source, path, workers, timeout, **kwargs)
+        except FileNotFoundError:
+            if source.kind != 'filename':
+                raise
+            msg = (
+                f'Failed to find provided source file `{source.display_name}` '
+                f'(resolved to `{source.location}`)'
+            )
+            raise FileNotFoundError(msg) from None
+        except ImportError as exc:
+            if source.kind != 'module':
+                raise
+            msg = f'Failed to import "{source.attr_name}" from "{source.location}".\n{exc}'
+            raise self.error(msg) from exc
+        except FactoryNotFoundError as exc:
+            msg = f'{exc}\nIncorrect argparse :module: or :func: values?'
+            raise self.error(msg) from exc
+
+    def _source_fingerprint(self, module_name, cache_key):
+        """Fingerprint the directive's source files for the persistent cache."""
+        if 'filename' in self.options:
+            source_files = [cache_key[1]]
+        else:
+            source_files = module_source_files(module_name)
+            if source_files is None:
+                return None
+        key = (*cache_key, tuple(self.config.autodoc_mock_imports))
+        if self.config.sphinxarg_formatter_width is None:
+            # Usage is wrapped at the terminal width
+            key += (shutil.get_terminal_size().columns,)
+        return fingerprint(key, source_files)
+
+    def _extract_parser(self, module_name, attr_name, cache_key):
+        """Return the parser tree, reusing a persistent cache entry if possible."""
+        source_fingerprint = None
+        if disk_cache.enabled:
+            source_fingerprint = self._source_fingerprint(module_name, cache_key)
+            if source_fingerprint is not None:
+                result = disk_cache.get(source_fingerprint)
+                if result is not None:
+                    return result
+
+        source = self._parser_source(module_name, attr_name)
+        path = cache_key[-1]
+        kwargs = {
+            'skip_default_values': 'nodefault' in self.options,
+            'skip_default_const_values': 'nodefaultconst' in self.options,
+            'color': 'color' in self.options,
+            'formatter_width': self.config.sphinxarg_formatter_width,
+            'prog': self.options.get('prog'),
+        }
+        timeout = self.config.sphinxarg_factory_timeout
+        if source in _timed_out_sources:
+            # Don't wait for it again, or for the import lock it may hold
+            return self._last_good_tree(source, cache_key)
+        # Files of the modules imported while loading, unknown for worker processes
+        dependencies = []
+        start = time.perf_counter()
+        try:
+            if self.config.sphinxarg_extraction_processes:
+                with self._timing.phase('parse'):
+                    result = self._extract_isolated(source, path, timeout, kwargs)
+                self._check_load_time(source, time.perf_counter() - start)
+            else:
+                if timeout is None:
+                    parser = self._load_parser(source)
+                else:
+                    try:
+                        parser = call_with_timeout(self._load_parser, timeout, source)
+                    except _LoadTimeoutError:
+                        # The mocks must not outlive this directive
+                        loader_session.abandon_mocks()
+                        raise
+                self._check_load_time(source, time.perf_counter() - start)
+                dependencies = imported_source_files(
+                    loader_session.imports.get(source.location, ())
+                )
+                submit = subtree_submitter(
+                    self.config.sphinxarg_parallel_extraction,
+                    self.config.sphinxarg_parallel_workers,
+                    source,
+                    path,
+                    **kwargs,
+                )
+                with self._timing.phase('parse'):
+                    result = parse_parser_path(parser, path, submit=submit, **kwargs)
+        except _LoadTimeoutError:
+            _timed_out_sources.add(source)
+            return self._last_good_tree(source, cache_key)
+        if source_fingerprint is not None and not disk_cache.set(
+            source_fingerprint, result, dependencies
+        ):
+            logger.debug('[sphinxarg] cannot store parser tree of %s persistently', cache_key)
+        if last_good_cache.enabled:
+            last_good_cache.set(fingerprint(cache_key, ()), result)
+        return result
+
+    @staticmethod
+    def _describe_source(source):
+        if source.kind == 'filename':
+            return f'`{source.display_name}`'
+        return f'"{source.attr_name}" from "{source.location}"'
+
+    def _check_load_time(self, source, seconds):
+        """Warn if loading the parser of *source* took *seconds*, longer than configured."""
+        limit = self.config.sphinxarg_factory_warning_time
+        if limit is not None and seconds > limit:
+            logger.warning(
+                '[sphinxarg] loading the parser %s took %.2fs',
+                self._describe_source(source),
+                seconds,
+                location=self.get_location(),
+            )
+
+    def _last_good_tree(self, source, cache_key):
+        """Return the tree last extracted for *cache_key*, after loading timed out."""
+        timeout = self.config.sphinxarg_factory_timeout
+        result = None
+        if last_good_cache.enabled:
+            result = last_good_cache.get(fingerprint(cache_key, ()))
+        if result is None:
+            msg = (
+                f'Loading the parser {self._describe_source(source)} took longer than '
+                f'{timeout}s, and no earlier build extracted it'
+            )
+            raise self.error(msg)
+        logger.warning(
+            '[sphinxarg] loading the parser %s took longer than %ss, '
+            'using the tree extracted by an earlier build',
+            self._describe_source(source),
+            timeout,
+            location=self.get_location(),
+        )
+        return result
+
+    def _load_snapshot(self, file):
+        """Return the snapshot document in *file*, see :mod:`sphinxarg.snapshot`."""
+        try:
+            with self._timing.phase('import'), open(file, encoding='utf-8') as f:
+                return load_snapshot(f)
+        except OSError:
+            msg = (
+                f'Failed to find provided snapshot file `{self.options["snapshot"]}` '
+                f'(resolved to `{file}`)'
+            )
+            raise FileNotFoundError(msg) from None
+        except ValueError as exc:
+            msg = f'Failed to read parser snapshot `{self.options["snapshot"]}`.\n{exc}'
+            raise self.error(msg) from exc
+
     def run(self):
-        if 'module' in self.options and 'func' in self.options:
+        if _profile_directory is not None:
+            return self._run_profiled(_profile_directory)
+        return self._run()
+
+    def _run_profiled(self, directory):
+        """Run the directive under :mod:`cProfile`, writing its statistics to *directory*."""
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(self._run)
+        finally:
+            path = Path(directory, f'{self.env.docname}-L{self.lineno}.pstats')
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path)
+
+    def _run(self):
+        if 'snapshot' in self.options:
+            module_name = None
+            attr_name = self.options.get('func') or Path(self.options['snapshot']).stem
+        elif 'module' in self.options and 'func' in self.options:
             module_name = self.options['module']
             attr_name = self.options['func']
         elif 'ref' in self.options:
@@ -733,60 +1351,70 @@ class ArgParseDirective(SphinxDirective):
             module_name = '.'.join(_parts[0:-1])
             attr_name = _parts[-1]
         elif 'filename' in self.options and 'func' in self.options:
-            mod = {}
-            f = self._open_filename()
-            code = compile(f.read(), self.options['filename'], 'exec')
-            exec(code, mod)
             module_name = None
             attr_name = self.options['func']
-            func = mod[attr_name]
         else:
-            msg = ':module: and :func: should be specified, or :ref:, or :filename: and :func:'
+            msg = (
+                ':module: and :func: should be specified, or :ref:, or :filename: and :func:, '
+                'or :snapshot:'
+            )
             raise self.error(msg)
 
-        # Skip this if we're dealing with a local file, since it obviously can't be imported
-        if 'filename' not in self.options:
-            with mock(self.config.autodoc_mock_imports):
-                try:
-                    mod = importlib.import_module(module_name)
-                except ImportError as exc:
-                    msg = (
-                        f'Failed to import "{attr_name}" from "{module_name}".\n'
-                        f'{sys.exc_info()[1]}'
-                    )
-                    raise self.error(msg) from exc
-
-                if not hasattr(mod, attr_name):
-                    msg = (
-                        f'Module "{module_name}" has no attribute "{attr_name}"\n'
-                        f'Incorrect argparse :module: or :func: values?'
-                    )
-                    raise self.error(msg)
-                func = getattr(mod, attr_name)
-
-        if isinstance(func, ArgumentParser):
-            parser = func
-        elif 'passparser' in self.options:
-            parser = ArgumentParser()
-            func(parser)
-        else:
-            parser = func()
         if 'path' not in self.options:
             self.options['path'] = ''
         path = str(self.options['path'])
-        if 'prog' in self.options:
-            parser.prog = self.options['prog']
-
-        result = parse_parser(
-            parser,
-            skip_default_values='nodefault' in self.options,
-            skip_default_const_values='nodefaultconst' in self.options,
-            color='color' in self.options,
-        )
-        result = parser_navigate(result, path)
-        if 'manpage' in self.options:
-            return self._construct_manpage_specific_structure(result)
+        if self.config.sphinxarg_timing or self.config.sphinxarg_timing_report:
+            self._timing = DirectiveTiming(self.env.docname, self.lineno, self._label())
+            _env_timings(self.env).append(self._timing)
+
+        # Directives documenting the same parser share the extracted tree.  Only
+        # the subtree selected by :path: is extracted, unless the whole tree
+        # has been extracted already.
+        cache_key = self._parser_cache_key(module_name, attr_name, path)
+        if 'snapshot' in self.options:
+            # Rebuild the page when the snapshot changes
+            self.env.note_dependency(cache_key[1])
+        result = parser_cache.get(cache_key)
+        if result is None:
+            full_tree = parser_cache.peek((*cache_key[:-1], '')) if path else None
+            if full_tree is not None:
+                with self._timing.phase('navigate'):
+                    result = parser_navigate(full_tree, path)
+            elif 'snapshot' in self.options:
+                document = self._load_snapshot(cache_key[1])
+                full_tree = document['tree']
+                parser_cache.set((*cache_key[:-1], ''), full_tree)
+                source = document.get('source') or {}
+                parser_cache.set(('snapshot source', cache_key[1]), source)
+                with self._timing.phase('navigate'):
+                    result = parser_navigate(full_tree, path)
+            else:
+                result = self._extract_parser(module_name, attr_name, cache_key)
+            parser_cache.set(cache_key, result)
+        if 'snapshot' in self.options:
+            # Ids are based on the source recorded by the snapshot, like when extracting
+            source = parser_cache.peek(('snapshot source', cache_key[1]))
+            module_name = source.get('module')
+            attr_name = self.options.get('func') or source.get('func') or attr_name
+        with self._timing.phase('render'):
+            if 'manpage' in self.options:
+                return self._construct_manpage_specific_structure(result)
+            return self._render(result, module_name, attr_name)
+
+    def _label(self):
+        """Return a short description of the directive's parser for reports."""
+        for option in ('snapshot', 'filename', 'ref'):
+            if option in self.options:
+                label = self.options[option]
+                break
+        else:
+            label = f'{self.options["module"]}.{self.options["func"]}'
+        if self.options['path']:
+            label += f' {self.options["path"]}'
+        return label
 
+    def _render(self, result, module_name, attr_name):
+        """Return the nodes documenting the extracted parser tree *result*."""
         # Handle nested content, where markdown needs to be preprocessed
         items = []
         nested_content = nodes.paragraph()
@@ -824,7 +1452,8 @@ class ArgParseDirective(SphinxDirective):
         self.state.document.note_explicit_target(target)
 
         domain = cast('ArgParseDomain', self.env.get_domain(ArgParseDomain.name))
-        domain.add_argparse_command(result, node_id, self.index_groups)
+        with self._timing.phase('domain'):
+            domain.add_argparse_command(result, node_id, self.index_groups)
 
         items.append(nodes.literal_block(text=result['usage']))
         items.extend(
@@ -849,7 +1478,8 @@ class ArgParseDirective(SphinxDirective):
             items.append(self._nested_parse_paragraph(result['epilog']))
 
         # Traverse the returned nodes, modifying the title IDs as necessary to avoid repeats
-        ensure_unique_ids(items)
+        with self._timing.phase('unique_ids'):
+            ensure_unique_ids(items)
 
         return items
 
@@ -960,6 +1590,110 @@ def _delete_temporary_files(app: Sphinx, _err) -> None:
         fpath.unlink(missing_ok=True)
 
 
+#: Sources whose parser took too long to load in this build
+_timed_out_sources: set[ParserSource] = set()
+
+
+def _reset_parser_cache(app: Sphinx) -> None:
+    parser_cache.clear()
+    fragment_cache.configure(app.config.sphinxarg_fragment_cache_size)
+    loader_session.clear()
+    _timed_out_sources.clear()
+    if app.config.sphinxarg_factory_timeout is not None:
+        last_good_cache.configure(
+            Path(app.doctreedir, 'sphinxarg-last-good'),
+            app.config.sphinxarg_persistent_cache_size,
+        )
+    else:
+        last_good_cache.configure(None)
+    if app.config.sphinxarg_persistent_cache:
+        disk_cache.configure(
+            Path(app.doctreedir, 'sphinxarg-cache'),
+            app.config.sphinxarg_persistent_cache_size,
+        )
+    else:
+        disk_cache.configure(None)
+
+
+def _report_imports(app: Sphinx, _err) -> None:
+    conflicts = loader_session.conflicts()
+    if conflicts:
+        logger.info(
+            '[sphinxarg] modules imported both with and without autodoc_mock_imports, '
+            'which may hold mocks where real modules were expected or the other way '
+            'round: %s',
+            ', '.join(conflicts),
+        )
+    loader_session.clear()
+
+
+def _report_parser_cache(app: Sphinx, _err) -> None:
+    logger.verbose(
+        'sphinxarg parser cache: %d hits, %d misses', parser_cache.hits, parser_cache.misses
+    )
+    if fragment_cache.enabled:
+        logger.verbose(
+            'sphinxarg fragment cache: %d hits, %d misses',
+            fragment_cache.hits,
+            fragment_cache.misses,
+        )
+    if disk_cache.enabled:
+        logger.verbose(
+            'sphinxarg persistent cache: %d hits, %d misses',
+            disk_cache.hits,
+            disk_cache.misses,
+        )
+
+
+#: Where directives write their profile, if profiling is enabled
+_profile_directory: Path | None = None
+
+
+def _configure_profiling(app: Sphinx) -> None:
+    global _profile_directory
+    if app.config.sphinxarg_profile or os.getenv('SPHINXARG_PROFILE'):
+        _profile_directory = Path(app.outdir, 'sphinxarg-profiles')
+    else:
+        _profile_directory = None
+
+
+def _env_timings(env: BuildEnvironment) -> list[DirectiveTiming]:
+    """Return the timings of the directives read into *env* during this build."""
+    timings: list[DirectiveTiming] = getattr(env, 'sphinxarg_timings', [])
+    return timings
+
+
+def _reset_timings(app: Sphinx) -> None:
+    # Kept in the environment, so parallel readers send theirs back with it;
+    # BuildEnvironment doesn't declare the attribute
+    setattr(app.env, 'sphinxarg_timings', [])  # noqa: B010
+
+
+def _merge_timings(app: Sphinx, env: BuildEnvironment, docnames, other) -> None:
+    # Directives read by parallel workers recorded their timing in their copy,
+    # which also holds those merged before the worker was forked
+    _env_timings(env).extend(
+        timing for timing in _env_timings(other) if timing.docname in docnames
+    )
+
+
+def _report_timings(app: Sphinx, _err) -> None:
+    timings = _env_timings(app.env)
+    if not timings:
+        return
+    logger.info('')
+    for line in summarize(timings):
+        logger.info('[sphinxarg] %s', line)
+    if app.config.sphinxarg_timing_report:
+        path = Path(app.outdir, app.config.sphinxarg_timing_report)
+        write_report(timings, str(path))
+        logger.info('[sphinxarg] timing report written to %s', path)
+
+
+def _shutdown_workers(app: Sphinx, _err) -> None:
+    shutdown_executor()
+
+
 def _create_temporary_dummy_file(
     app: Sphinx, domain: Domain, docname: str, title: str
 ) -> None:
@@ -1032,8 +1766,29 @@ def setup(app: Sphinx):
         'sphinxarg_commands_by_group_index_title', CommandsByGroupIndex.localname, 'html', str
     )
 
+    app.add_config_value('sphinxarg_formatter_width', None, 'env', (int, type(None)))
+    app.add_config_value('sphinxarg_fragment_cache_size', 4096, '', int)
+    app.add_config_value('sphinxarg_persistent_cache', False, '', bool)
+    app.add_config_value('sphinxarg_persistent_cache_size', 64 * 1024 * 1024, '', int)
+    app.add_config_value('sphinxarg_parallel_extraction', None, '', (str, type(None)))
+    app.add_config_value('sphinxarg_parallel_workers', None, '', (int, type(None)))
+    app.add_config_value('sphinxarg_extraction_processes', None, '', (int, type(None)))
+    app.add_config_value('sphinxarg_factory_timeout', None, '', (int, float, type(None)))
+    app.add_config_value('sphinxarg_factory_warning_time', None, '', (int, float, type(None)))
+    app.add_config_value('sphinxarg_timing', False, '', bool)
+    app.add_config_value('sphinxarg_timing_report', None, '', (str, type(None)))
+    app.add_config_value('sphinxarg_profile', False, '', bool)
+
     app.connect('builder-inited', configure_ext)
+    app.connect('builder-inited', _reset_parser_cache)
+    app.connect('builder-inited', _reset_timings)
+    app.connect('builder-inited', _configure_profiling)
+    app.connect('env-merge-info', _merge_timings)
     app.connect('build-finished', _delete_temporary_files)
+    app.connect('build-finished', _report_parser_cache)
+    app.connect('build-finished', _report_imports)
+    app.connect('build-finished', _report_timings)
+    app.connect('build-finished', _shutdown_workers)
     return {
         'version': __version__,
         'parallel_read_safe': True,
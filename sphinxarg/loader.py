@@ -0,0 +1,308 @@
+"""Loading the parsers documented by the ``argparse`` directive."""
+
+from __future__ import annotations
+
+import contextlib
+import importlib
+import os
+import sys
+import threading
+from argparse import ArgumentParser
+from concurrent.futures import Future, wait
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from sphinxarg.static import DynamicCodeException, load_static
+
+try:
+    from sphinx.ext.autodoc.mock import MockFinder, ismockmodule, mock
+except ImportError:
+    from sphinx.ext.autodoc import mock
+    # A persistent bug in sphinx / autodoc causes problems during importing (#82)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator, Sequence
+    from types import CodeType
+    from typing import Any
+
+
+class FactoryNotFoundError(AttributeError):
+    pass
+
+
+class _LoadTimeoutError(Exception):
+    """Loading a parser took longer than its timeout.
+
+    Unlike :exc:`TimeoutError`, it cannot be raised by the loaded code itself.
+    """
+
+
+def import_factory(module_name: str, attr_name: str, mock_imports: Sequence[str] = ()) -> Any:
+    """Import *module_name* and return its *attr_name* attribute.
+
+    The modules in *mock_imports* are mocked while importing.  Raises
+    :exc:`ImportError` if the module cannot be imported, returns ``None`` if it
+    has no such attribute.
+    """
+    with mock(list(mock_imports)):
+        mod = importlib.import_module(module_name)
+        return getattr(mod, attr_name, None)
+
+
+#: Code objects of executed files: file name -> (version, display name, code)
+_code_cache: dict[str, tuple[tuple[int, int], str, CodeType]] = {}
+
+
+def _file_version(filename: str) -> tuple[int, int]:
+    stat = os.stat(filename)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def compile_file(filename: str, display_name: str | None = None) -> CodeType:
+    """Return the code object of the Python file *filename*.
+
+    The code is compiled again only when the file's modification time or size
+    changes.
+    """
+    display_name = display_name or filename
+    version = _file_version(filename)
+    cached = _code_cache.get(filename)
+    if cached is not None and cached[:2] == (version, display_name):
+        return cached[2]
+    code = compile(Path(filename).read_text(), display_name, 'exec')
+    _code_cache[filename] = (version, display_name, code)
+    return code
+
+
+def exec_file(filename: str, display_name: str | None = None) -> dict[str, Any]:
+    """Execute the Python file *filename* and return its globals."""
+    mod: dict[str, Any] = {}
+    exec(compile_file(filename, display_name), mod)
+    return mod
+
+
+def exec_factory(filename: str, attr_name: str, display_name: str | None = None) -> Any:
+    """Execute the Python file *filename* and return its *attr_name* global."""
+    return exec_file(filename, display_name)[attr_name]
+
+
+def call_factory(func: Any, passparser: bool = False) -> ArgumentParser:
+    """Return the parser made by *func*, which may also be a parser itself."""
+    if isinstance(func, ArgumentParser):
+        parser = func
+    elif passparser:
+        parser = ArgumentParser()
+        func(parser)
+    else:
+        parser = func()
+    return parser
+
+
+def call_with_timeout(func: Callable[..., Any], timeout: float, *args: Any) -> Any:
+    """Return ``func(*args)``, called in a daemon thread.
+
+    Raises :exc:`_LoadTimeoutError` if the call has not returned after
+    *timeout* seconds.  Threads cannot be stopped, so the call then keeps
+    running in the background, but doesn't keep the interpreter from exiting.
+    """
+    future: Future = Future()
+
+    def run() -> None:
+        future.set_running_or_notify_cancel()
+        try:
+            result = func(*args)
+        except BaseException as exc:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    threading.Thread(target=run, name='sphinxarg-factory', daemon=True).start()
+    if not wait([future], timeout).done:
+        msg = f'call did not return within {timeout}s'
+        raise _LoadTimeoutError(msg)
+    return future.result()
+
+
+class ParserSource(NamedTuple):
+    """A picklable description of where a directive's parser comes from.
+
+    Worker processes use it to load the parser themselves, as argparse parsers
+    cannot be pickled.
+    """
+
+    #: ``'module'`` or ``'filename'``
+    kind: str
+    #: The module name or the resolved file name
+    location: str
+    attr_name: str
+    passparser: bool = False
+    mock_imports: tuple[str, ...] = ()
+    #: The file name as given in the directive, used in tracebacks
+    display_name: str | None = None
+    #: Build the parser from the file without executing it, if possible
+    static: bool = False
+
+    def load(self) -> ArgumentParser:
+        if self.kind == 'filename':
+            if self.static:
+                try:
+                    return load_static(
+                        self.location, self.attr_name, self.passparser, self.display_name
+                    )
+                except DynamicCodeException:
+                    pass
+            func = exec_factory(self.location, self.attr_name, self.display_name)
+        else:
+            func = import_factory(self.location, self.attr_name, self.mock_imports)
+            if func is None:
+                msg = f'Module "{self.location}" has no attribute "{self.attr_name}"'
+                raise FactoryNotFoundError(msg)
+        return call_factory(func, self.passparser)
+
+
+class LoaderSession:
+    """Parser factories and parsers loaded during one build.
+
+    Every ``(module, attribute)`` pair is resolved once and every
+    :class:`ParserSource` loaded once; extraction doesn't modify parsers, so
+    directives share them.  There is one mock finder per list of mocked
+    modules.  Its mock modules are only in :data:`sys.modules` while importing
+    through the session, and are kept aside in between, so later imports reuse
+    them without leaking them to other code.
+
+    The modules imported while mocking and while not mocking are recorded:
+    modules in both lists, and mocked modules already imported for real, may
+    hold mocks where the real module was expected or the other way round.
+    The modules first imported while loading each module or file are recorded
+    as well.
+
+    An import abandoned after a timeout keeps running in its thread; its mocks
+    are removed by :meth:`abandon_mocks`, so that they don't outlive it.
+    """
+
+    def __init__(self) -> None:
+        self.factories: dict[tuple[str, str, tuple[str, ...]], Any] = {}
+        self.parsers: dict[ParserSource, ArgumentParser] = {}
+        #: Globals of executed files, by file name and version
+        self.namespaces: dict[tuple[str, tuple[int, int]], dict[str, Any]] = {}
+        #: Modules first imported while mocking, and while not mocking
+        self.imported_with_mocks: set[str] = set()
+        self.imported_without_mocks: set[str] = set()
+        #: Mocked modules which were already imported for real
+        self.not_mocked: set[str] = set()
+        #: Modules first imported while importing a module or executing a file
+        self.imports: dict[str, set[str]] = {}
+        self._finders: dict[tuple[str, ...], MockFinder] = {}
+        self._mock_modules: dict[str, Any] = {}
+        #: Finders of the imports in progress
+        self._active: list[MockFinder] = []
+
+    def clear(self) -> None:
+        """Forget the loaded factories and parsers, and the recorded imports."""
+        self.factories.clear()
+        self.parsers.clear()
+        self.namespaces.clear()
+        self.imported_with_mocks.clear()
+        self.imported_without_mocks.clear()
+        self.not_mocked.clear()
+        self.imports.clear()
+        self._finders.clear()
+        self._mock_modules.clear()
+
+    @contextlib.contextmanager
+    def _recording(self, *imported: set[str]) -> Generator[None, None, None]:
+        before = set(sys.modules)
+        try:
+            yield
+        finally:
+            new = sys.modules.keys() - before
+            for names in imported:
+                names.update(new)
+
+    @contextlib.contextmanager
+    def _mocking(
+        self, mock_imports: tuple[str, ...], imported: set[str]
+    ) -> Generator[None, None, None]:
+        finder = self._finders.get(mock_imports)
+        if finder is None:
+            finder = self._finders[mock_imports] = MockFinder(list(mock_imports))
+        self._active.append(finder)
+        for name in mock_imports:
+            module = sys.modules.get(name)
+            if module is not None and not ismockmodule(module):
+                self.not_mocked.add(name)
+        for name, module in self._mock_modules.items():
+            sys.modules.setdefault(name, module)
+        sys.meta_path.insert(0, finder)
+        try:
+            with self._recording(self.imported_with_mocks, imported):
+                yield
+        finally:
+            # Unless abandon_mocks() already removed the mocks
+            if finder in self._active:
+                self._active.remove(finder)
+                self._remove_mocks(finder)
+
+    def _remove_mocks(self, finder: MockFinder) -> None:
+        with contextlib.suppress(ValueError):
+            sys.meta_path.remove(finder)
+        for name in [*self._mock_modules, *finder.mocked_modules]:
+            if ismockmodule(sys.modules.get(name)):
+                self._mock_modules[name] = sys.modules.pop(name)
+        finder.mocked_modules.clear()
+
+    def abandon_mocks(self) -> None:
+        """Remove the mocks of the imports in progress, after they timed out.
+
+        The abandoned imports keep running without the mocks, and leave
+        :data:`sys.meta_path` and :data:`sys.modules` alone when they finish.
+        Their finders are not reused.
+        """
+        for finder in self._active:
+            self._remove_mocks(finder)
+            for key, value in list(self._finders.items()):
+                if value is finder:
+                    del self._finders[key]
+        self._active.clear()
+
+    def import_factory(
+        self, module_name: str, attr_name: str, mock_imports: Sequence[str] = ()
+    ) -> Any:
+        """Like :func:`import_factory`, resolving every pair once."""
+        key = (module_name, attr_name, tuple(mock_imports))
+        try:
+            return self.factories[key]
+        except KeyError:
+            pass
+        imported = self.imports.setdefault(module_name, set())
+        if mock_imports:
+            context = self._mocking(key[2], imported)
+        else:
+            context = self._recording(self.imported_without_mocks, imported)
+        with context:
+            mod = importlib.import_module(module_name)
+        func = self.factories[key] = getattr(mod, attr_name, None)
+        return func
+
+    def exec_factory(
+        self, filename: str, attr_name: str, display_name: str | None = None
+    ) -> Any:
+        """Like :func:`exec_factory`, executing every version of a file once.
+
+        The modules the file imports are recorded.
+        """
+        key = (filename, _file_version(filename))
+        mod = self.namespaces.get(key)
+        if mod is None:
+            imported = self.imports.setdefault(filename, set())
+            with self._recording(self.imported_without_mocks, imported):
+                mod = self.namespaces[key] = exec_file(filename, display_name)
+        return mod[attr_name]
+
+    def conflicts(self) -> list[str]:
+        """Return the modules which may have been imported with and without mocks."""
+        return sorted(self.imported_with_mocks & self.imported_without_mocks | self.not_mocked)
+
+
+#: The session of the ``argparse`` directive, cleared when a build starts.
+loader_session = LoaderSession()
@@ -0,0 +1,247 @@
+"""Compact data model for extracted parser trees.
+
+The records use ``__slots__`` instead of per-node dictionaries, and parents are
+referenced rather than copied into every child.  All records are read-only
+:class:`~collections.abc.Mapping` views with the keys of the dictionaries
+returned by earlier versions, so existing consumers keep working and records
+compare equal to those dictionaries.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from typing import Any
+
+
+class _Record(Mapping):
+    __slots__ = ()
+
+    #: Mapping keys, in the order of the historical dictionaries
+    _keys: tuple[str, ...] = ()
+
+    def _has(self, key: str) -> bool:
+        return getattr(self, key) is not None
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._keys and self._has(key):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in self._keys if self._has(key))
+
+    def __len__(self) -> int:
+        return sum(1 for _key in self)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({dict(self)!r})'
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a copy made of plain dictionaries and lists."""
+        return {key: _to_plain(value) for key, value in self.items()}
+
+
+def _to_plain(value: Any) -> Any:
+    if isinstance(value, _Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_to_plain(item) for item in value]
+    return value
+
+
+class ArgumentOption(_Record):
+    """An argument or option of an action group."""
+
+    __slots__ = ('choices', 'default', 'help', 'name')
+    _keys = ('name', 'default', 'help', 'choices')
+
+    def __init__(self, name: list[str], default: Any, help: str, choices: Any = None) -> None:
+        self.name = name
+        self.default = default
+        self.help = help
+        self.choices = choices
+
+    def _has(self, key: str) -> bool:
+        return key != 'choices' or self.choices is not None
+
+
+class ActionGroup(_Record):
+    """A titled group of arguments and options."""
+
+    __slots__ = ('description', 'options', 'title')
+    _keys = ('title', 'description', 'options')
+
+    def __init__(
+        self, title: str | None, description: str | None, options: list[ArgumentOption]
+    ) -> None:
+        self.title = title
+        self.description = description
+        self.options = options
+
+    def _has(self, key: str) -> bool:
+        return True
+
+
+class ParserNode(_Record):
+    """A parser or sub-command in the extracted tree.
+
+    ``prog`` is only set for the node extraction started from; ``help`` and
+    ``parent`` only exist for sub-commands.  ``command`` holds the full
+    command (see :func:`sphinxarg.utils.command_pos_args`) and is computed
+    once, when the node is created.  The node extraction started from also
+    holds the :class:`PathIndex` of its subtree in ``index``.
+    """
+
+    __slots__ = (
+        'action_groups',
+        'bare_usage',
+        'children',
+        'command',
+        'description',
+        'epilog',
+        'help',
+        'identifier',
+        'index',
+        'name',
+        'parent',
+        'prog',
+        'usage',
+    )
+    _keys = (
+        'name',
+        'help',
+        'usage',
+        'bare_usage',
+        'prog',
+        'parent',
+        'identifier',
+        'description',
+        'epilog',
+        'children',
+        'action_groups',
+    )
+
+    def __init__(
+        self,
+        name: str,
+        usage: str,
+        bare_usage: str,
+        *,
+        prog: str | None = None,
+        help: str | None = None,
+        parent: ParserNode | None = None,
+        identifier: str | None = None,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.usage = usage
+        self.bare_usage = bare_usage
+        self.prog = prog
+        self.parent = parent
+        self.identifier = identifier
+        self.description: str | None = None
+        self.epilog: str | None = None
+        self.children: list[ParserNode] | None = None
+        self.action_groups: list[ActionGroup] | None = None
+        self.index: PathIndex | None = None
+
+        own = name or prog or ''
+        self.command: str = own if parent is None else f'{parent.command} {own}'
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any]) -> ParserNode:
+        """Return the node described by a dictionary like those of earlier versions.
+
+        The ``parent`` dictionaries become parent nodes.  Extraction fills in
+        the other keys.
+        """
+        parent = data.get('parent')
+        return cls(
+            data.get('name', ''),
+            data.get('usage', ''),
+            data.get('bare_usage', ''),
+            prog=data.get('prog'),
+            help=data.get('help') if parent is not None else None,
+            parent=None if parent is None else cls.from_mapping(parent),
+            identifier=data.get('identifier'),
+        )
+
+    def _has(self, key: str) -> bool:
+        if key == 'help':
+            return self.parent is not None
+        return getattr(self, key) is not None
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'parent' and self.parent is not None:
+            return _ParentView(self.parent)
+        return super().__getitem__(key)
+
+
+class _ParentView(_Record):
+    """The ``{'name', 'prog', 'parent'}`` mapping describing a node's parent."""
+
+    __slots__ = ('_node',)
+    _keys = ('name', 'prog', 'parent')
+
+    def __init__(self, node: ParserNode) -> None:
+        self._node = node
+
+    @property
+    def command(self) -> str:
+        return self._node.command
+
+    def _has(self, key: str) -> bool:
+        return key != 'parent' or self._node.parent is not None
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'name':
+            return self._node.name
+        if key == 'prog':
+            return self._node.prog or ''
+        if key == 'parent' and self._node.parent is not None:
+            return _ParentView(self._node.parent)
+        raise KeyError(key)
+
+
+class PathIndex:
+    """The nodes of an extracted subtree, by path.
+
+    A path is a tuple of sub-command names relative to the indexed node, which
+    is itself stored under ``()``.  Each node is stored once, under the first
+    name of every sub-command on its path; aliases map to those names in
+    ``aliases``, keyed by the path of the alias.
+    """
+
+    __slots__ = ('aliases', 'nodes')
+
+    def __init__(self) -> None:
+        self.nodes: dict[tuple[str, ...], ParserNode] = {}
+        self.aliases: dict[tuple[str, ...], str] = {}
+
+    def add(
+        self, path: tuple[str, ...], node: ParserNode, aliases: Iterable[str] = ()
+    ) -> None:
+        self.nodes[path] = node
+        for alias in aliases:
+            self.aliases[(*path[:-1], alias)] = path[-1]
+
+    def update(self, prefix: tuple[str, ...], other: PathIndex) -> None:
+        """Add the entries of *other*, the index of the node at *prefix*."""
+        for path, node in other.nodes.items():
+            self.nodes[(*prefix, *path)] = node
+        for path, name in other.aliases.items():
+            self.aliases[(*prefix, *path)] = name
+
+    def names(self, path: tuple[str, ...]) -> list[str]:
+        """Return the names and aliases of the sub-commands of the node at *path*."""
+        depth = len(path) + 1
+        return [
+            key[-1]
+            for keys in (self.nodes, self.aliases)
+            for key in keys
+            if len(key) == depth and key[:-1] == path
+        ]
@@ -0,0 +1,161 @@
+"""Parallel extraction of sub-command subtrees.
+
+:func:`~sphinxarg.parser.parse_parser` can hand the subtrees of the top-level
+sub-commands to a worker pool.  In ``'thread'`` mode the workers extract them
+from the parser object itself.  argparse parsers cannot be pickled, so in
+``'process'`` mode every worker loads the parser from its
+:class:`~sphinxarg.loader.ParserSource` and extracts the subtree selected by
+its path.  Either way the merged tree equals the one extracted serially.
+
+:func:`extract_isolated` loads and extracts a whole parser in a pool of worker
+processes instead, so the modules imported for it stay out of the calling
+process.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING
+
+from sphinxarg.loader import _LoadTimeoutError
+from sphinxarg.parser import parse_parser, parse_parser_path
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from concurrent.futures import Executor, Future
+    from typing import Any
+
+    from sphinxarg.loader import ParserSource
+    from sphinxarg.model import ParserNode
+
+MODES = ('thread', 'process')
+
+_executor: tuple[str, int | None, Executor] | None = None
+_worker_pool: tuple[int, ProcessPoolExecutor] | None = None
+
+
+def get_executor(mode: str, workers: int | None = None) -> Executor:
+    """Return the shared pool for *mode*, creating or replacing it as needed."""
+    global _executor
+    if _executor is not None:
+        if _executor[:2] == (mode, workers):
+            return _executor[2]
+        shutdown_executor()
+    if mode == 'thread':
+        executor: Executor = ThreadPoolExecutor(workers, thread_name_prefix='sphinxarg')
+    elif mode == 'process':
+        executor = ProcessPoolExecutor(workers)
+    else:
+        msg = f'Unknown parallel extraction mode {mode!r}, expected one of {MODES}'
+        raise ValueError(msg)
+    _executor = (mode, workers, executor)
+    return executor
+
+
+def get_worker_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared pool of extraction processes, creating or resizing it as needed."""
+    global _worker_pool
+    if _worker_pool is not None:
+        if _worker_pool[0] == workers:
+            return _worker_pool[1]
+        _worker_pool[1].shutdown()
+    _worker_pool = (workers, ProcessPoolExecutor(workers))
+    return _worker_pool[1]
+
+
+def shutdown_executor() -> None:
+    """Shut the shared pools down, if there are any."""
+    global _executor, _worker_pool
+    if _executor is not None:
+        _executor[2].shutdown()
+        _executor = None
+    if _worker_pool is not None:
+        _worker_pool[1].shutdown()
+        _worker_pool = None
+
+
+def _terminate_worker_pool() -> None:
+    """Stop the shared pool of extraction processes without waiting for them."""
+    global _worker_pool
+    if _worker_pool is None:
+        return
+    executor = _worker_pool[1]
+    _worker_pool = None
+    if hasattr(executor, 'terminate_workers'):
+        executor.terminate_workers()
+        return
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_isolated(
+    source: ParserSource,
+    path: str | list[str],
+    workers: int,
+    timeout: float | None = None,
+    **kwargs: Any,
+) -> ParserNode:
+    """Load the parser of *source* and extract the tree at *path* in a worker process.
+
+    *kwargs* are the options of :func:`~sphinxarg.parser.parse_parser_path`.
+    The pool of *workers* processes is kept for later calls, and a worker
+    reuses the parsers it has loaded.  Errors loading or extracting the parser
+    are raised here.  If the tree is not extracted within *timeout* seconds,
+    the workers are terminated and :exc:`~sphinxarg.loader._LoadTimeoutError`
+    is raised.
+    """
+    future = get_worker_pool(workers).submit(_extract_subtree, source, path, kwargs)
+    if not wait([future], timeout).done:
+        _terminate_worker_pool()
+        msg = f'extraction did not finish within {timeout}s'
+        raise _LoadTimeoutError(msg)
+    return future.result()
+
+
+def subtree_submitter(
+    mode: str | None,
+    workers: int | None,
+    source: ParserSource,
+    path: str | list[str],
+    **kwargs: Any,
+) -> Callable[[Any, ParserNode, str], Future] | None:
+    """Return a ``submit`` callable for :func:`~sphinxarg.parser.parse_parser`.
+
+    *source* and *path* locate the parser being extracted, *kwargs* are the
+    extraction options.  ``None`` is returned if *mode* is ``None``, for
+    serial extraction.
+    """
+    if mode is None:
+        return None
+    executor = get_executor(mode, workers)
+    if mode == 'thread':
+
+        def submit(subparser: Any, subdata: ParserNode, prog: str) -> Future:
+            return executor.submit(
+                parse_parser, subparser, subdata, **{**kwargs, 'prog': prog}
+            )
+
+    else:
+        if isinstance(path, str):
+            path = path.split()
+
+        def submit(subparser: Any, subdata: ParserNode, prog: str) -> Future:
+            subpath = [*path, subdata.identifier or subdata.name]
+            return executor.submit(_extract_subtree, source, subpath, kwargs)
+
+    return submit
+
+
+#: Parsers loaded by a worker process, by source
+_worker_parsers: dict[ParserSource, Any] = {}
+
+
+def _extract_subtree(
+    source: ParserSource, path: str | list[str], kwargs: dict[str, Any]
+) -> ParserNode:
+    """Extract the subtree at *path* in a worker process."""
+    parser = _worker_parsers.get(source)
+    if parser is None:
+        parser = _worker_parsers[source] = source.load()
+    return parse_parser_path(parser, path, **kwargs)
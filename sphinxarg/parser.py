@@ -1,81 +1,163 @@
 from __future__ import annotations
 
 import contextlib
+import difflib
 import re
 from argparse import _HelpAction, _StoreConstAction, _SubParsersAction
+from gettext import gettext
+
+from sphinxarg.model import ActionGroup, ArgumentOption, ParserNode, PathIndex
+
+_GROUP_TITLES = {
+    'options': 'Named Arguments',
+    'positional arguments': 'Positional Arguments',
+}
 
 
 class NavigationException(Exception):  # noqa: N818
     pass
 
 
+class ParserCycleException(Exception):  # noqa: N818
+    pass
+
+
 def parser_navigate(parser_result, path, current_path=None):
+    """Return the node of *parser_result* selected by *path*.
+
+    *path* is a list or a whitespace separated string of subcommand names or
+    aliases.  Trees extracted by `parse_parser` are navigated through the
+    :class:`~sphinxarg.model.PathIndex` of the node extraction started from,
+    for other nodes and plain dictionaries the children are searched.
+    """
     if isinstance(path, str):
         if path == '':
             return parser_result
         path = re.split(r'\s+', path)
     current_path = current_path or []
-    if len(path) == 0:
-        return parser_result
-    if 'children' not in parser_result:
-        msg = f'Current parser has no child elements.  (path: {" ".join(current_path)})'
-        raise NavigationException(msg)
-    next_hop = path.pop(0)
-    for child in parser_result['children']:
-        # identifer is only used for aliased subcommands
-        identifier = child['identifier'] if 'identifier' in child else child['name']
-        if identifier == next_hop:
-            current_path.append(next_hop)
-            return parser_navigate(child, path, current_path)
+    index = getattr(parser_result, 'index', None)
+    if index is not None:
+        node = index.nodes.get(tuple(path))
+        if node is not None:
+            current_path.extend(path)
+            return node
+        return _navigate_index(index, path, current_path)
+    for next_hop in path:
+        if 'children' not in parser_result:
+            msg = f'Current parser has no child elements.  (path: {" ".join(current_path)})'
+            raise NavigationException(msg)
+        identifiers = []
+        for child in parser_result['children']:
+            # identifer is only used for aliased subcommands
+            identifier = child['identifier'] if 'identifier' in child else child['name']
+            if identifier == next_hop:
+                current_path.append(next_hop)
+                parser_result = child
+                break
+            identifiers.append(identifier)
+        else:
+            raise _no_child_element(next_hop, current_path, identifiers)
+    return parser_result
+
+
+def _navigate_index(index, path, current_path):
+    """Resolve *path* hop by hop in *index*, for aliases and errors."""
+    resolved = ()
+    for next_hop in path:
+        if index.nodes[resolved].children is None:
+            msg = f'Current parser has no child elements.  (path: {" ".join(current_path)})'
+            raise NavigationException(msg)
+        if (*resolved, next_hop) in index.nodes:
+            name = next_hop
+        else:
+            name = index.aliases.get((*resolved, next_hop))
+            if name is None:
+                raise _no_child_element(next_hop, current_path, index.names(resolved))
+        resolved = (*resolved, name)
+        current_path.append(next_hop)
+    return index.nodes[resolved]
+
+
+def _no_child_element(next_hop, current_path, names):
+    """Return the exception for a missing child, suggesting close *names*."""
     msg = (
         f'Current parser has no child element with name: {next_hop} '
         f'(path: {" ".join(current_path)})'
     )
-    raise NavigationException(msg)
+    suggestions = difflib.get_close_matches(next_hop, names)
+    if suggestions:
+        msg += f'. Did you mean: {", ".join(suggestions)}?'
+    return NavigationException(msg)
 
 
-def _try_add_parser_attribute(data, parser, attribname):
+def _parser_attribute(parser, attribname):
+    """Return a non-empty string attribute of *parser*, or ``None``."""
     attribval = getattr(parser, attribname, None)
-    if attribval is None:
-        return
-    if not isinstance(attribval, str):
-        return
-    if len(attribval) > 0:
-        data[attribname] = attribval
+    if not isinstance(attribval, str) or len(attribval) == 0:
+        return None
+    return attribval
+
+
+def _get_formatter(parser, prog, width=None, color=False):
+    """Return a help formatter for *parser* named *prog*.
+
+    Unlike ``parser._get_formatter()``, the program name, the width and the
+    color setting are given to the formatter rather than read from *parser*,
+    so *parser* doesn't have to be modified.
+    """
+    formatter = None
+    if width is not None:
+        # A formatter_class that doesn't take a width gets the default
+        with contextlib.suppress(TypeError):
+            formatter = parser.formatter_class(prog=prog, width=width)
+    if formatter is None:
+        formatter = parser.formatter_class(prog=prog)
+    if hasattr(formatter, '_set_color'):
+        # Argparse in Python 3.14 uses ANSI color codes by default (#72)
+        formatter._set_color(color)
+    return formatter
 
 
-def _format_usage_without_prefix(parser):
+def _format_usage_without_prefix(parser, prog, width=None, color=False):
     """
     Use private argparse APIs to get the usage string without
     the 'usage: ' prefix.
     """
-    fmt = parser._get_formatter()
+    fmt = _get_formatter(parser, prog, width, color)
     fmt.add_usage(parser.usage, parser._actions, parser._mutually_exclusive_groups, prefix='')
     return fmt.format_help().strip()
 
 
-def parse_parser(parser, data=None, **kwargs):
-    """Take data from argparse argument parser.
+def _format_usage(parser, prog, width=None, color=False):
+    """Return the usage of *parser* with and without the 'usage: ' prefix.
 
-    Keyword arguments:
-        - skip_default_values
-        - skip_default_const_values
-        - color
+    The usage is formatted with the prefix, like ``parser.format_usage()``.
+    Argparse wraps it to fit the width with the prefix, so the bare usage is
+    only derived from it when it is not wrapped: a usage on one line or a
+    custom usage string.  Wrapped usage is formatted again without the
+    prefix, as its lines may break at other arguments.
     """
-    # Argparse in Python 3.14 uses ANSI color codes by default (#72)
-    if hasattr(parser, 'color'):
-        parser.color = kwargs.get('color', False)
-        # Disable colors, unless a flag is presented through user-settings
+    fmt = _get_formatter(parser, prog, width, color)
+    fmt.add_usage(parser.usage, parser._actions, parser._mutually_exclusive_groups)
+    usage = fmt.format_help().strip()
+    prefix = gettext('usage: ')
+    # A colored prefix can't be removed
+    if usage.startswith(prefix) and (parser.usage is not None or '\n' not in usage):
+        return usage, usage[len(prefix) :].strip()
+    return usage, _format_usage_without_prefix(parser, prog, width, color)
 
-    if data is None:
-        data = {
-            'name': '',
-            'usage': parser.format_usage().strip(),
-            'bare_usage': _format_usage_without_prefix(parser),
-            'prog': parser.prog,
-        }
-    _try_add_parser_attribute(data, parser, 'description')
-    _try_add_parser_attribute(data, parser, 'epilog')
+
+def _root_data(parser, prog, width=None, color=False):
+    usage, bare_usage = _format_usage(parser, prog, width, color)
+    return ParserNode('', usage, bare_usage, prog=prog)
+
+
+def _iter_subcommands(parser):
+    """Yield ``(name, aliases, subparser, help)`` for each subcommand of *parser*.
+
+    Commands which share an existing parser are an alias, they are folded into
+    the first name the parser was registered with.
+    """
     for action in parser._get_positional_actions():
         if not isinstance(action, _SubParsersAction):
             continue
@@ -83,8 +165,6 @@ def parse_parser(parser, data=None, **kwargs):
         for item in action._choices_actions:
             helps[item.dest] = item.help
 
-        # commands which share an existing parser are an alias,
-        # don't duplicate docs
         subsection_alias = {}
         subsection_alias_names = set()
         for name, subaction in action._name_parser_map.items():
@@ -97,30 +177,87 @@ def parse_parser(parser, data=None, **kwargs):
         for name, subaction in action._name_parser_map.items():
             if name in subsection_alias_names:
                 continue
+            yield name, subsection_alias[subaction], subaction, helps.get(name, '')
+
+
+def _subcommand_iterator(parser, subcommand_lists):
+    """Iterate over the subcommands of *parser*, listed once per parser object."""
+    key = id(parser)
+    if key not in subcommand_lists:
+        subcommand_lists[key] = list(_iter_subcommands(parser))
+    return iter(subcommand_lists[key])
 
-            if hasattr(subaction, 'color'):
-                subaction.color = parser.color
-                # Color is not inherited, must be set again
-
-            subalias = subsection_alias[subaction]
-            subaction.prog = f'{parser.prog} {name}'
-            subdata = {
-                'name': name if not subalias else f'{name} ({", ".join(subalias)})',
-                'help': helps.get(name, ''),
-                'usage': subaction.format_usage().strip(),
-                'bare_usage': _format_usage_without_prefix(subaction),
-                'parent': {
-                    'name': '' if 'name' not in data else data['name'],
-                    'prog': '' if 'prog' not in data else data['prog'],
-                },
-            }
-            if 'parent' in data:
-                subdata['parent'].update({'parent': data['parent']})
-            if subalias:
-                subdata['identifier'] = name
-            parse_parser(subaction, subdata, **kwargs)
-            data.setdefault('children', []).append(subdata)
 
+def _subcommand_data(data, prog, name, subalias, subaction, help_str, width=None, color=False):
+    """Return the initial data of *subaction*, the subcommand *name* of *prog*."""
+    usage, bare_usage = _format_usage(subaction, f'{prog} {name}', width, color)
+    return ParserNode(
+        name if not subalias else f'{name} ({", ".join(subalias)})',
+        usage,
+        bare_usage,
+        help=help_str,
+        parent=data,
+        identifier=name if subalias else None,
+    )
+
+
+def parse_parser_path(parser, path, **kwargs):
+    """Take data from the subcommand of an argparse parser selected by *path*.
+
+    This is equivalent to ``parser_navigate(parse_parser(parser), path)``, but
+    the path is resolved on the parser before extraction, so only the selected
+    subtree is extracted.  The keyword arguments are those of `parse_parser`.
+    """
+    if isinstance(path, str):
+        path = re.split(r'\s+', path) if path != '' else []
+    prog = kwargs.pop('prog', None) or parser.prog
+    width = kwargs.get('formatter_width')
+    color = kwargs.get('color', False)
+    data = _root_data(parser, prog, width, color)
+    current_path = []
+    for next_hop in path:
+        subcommands = list(_iter_subcommands(parser))
+        if not subcommands:
+            msg = f'Current parser has no child elements.  (path: {" ".join(current_path)})'
+            raise NavigationException(msg)
+        for subcommand in subcommands:
+            if next_hop == subcommand[0] or next_hop in subcommand[1]:
+                break
+        else:
+            names = [
+                name for subcommand in subcommands for name in (subcommand[0], *subcommand[1])
+            ]
+            raise _no_child_element(next_hop, current_path, names)
+        data = _subcommand_data(data, prog, *subcommand, width=width, color=color)
+        parser = subcommand[2]
+        prog = f'{prog} {subcommand[0]}'
+        current_path.append(next_hop)
+    return parse_parser(parser, data, prog=prog, **kwargs)
+
+
+def parse_parser(parser, data=None, **kwargs):
+    """Take data from argparse argument parser.
+
+    Returns a :class:`~sphinxarg.model.ParserNode`; *data* is the node to fill
+    in, by default a new root node for *parser*.  A dictionary *data*, as
+    accepted by earlier versions, is converted to a new node, see
+    :meth:`~sphinxarg.model.ParserNode.from_mapping`.  *parser* and its subparsers
+    are not modified, so the same parser can be extracted again, with other
+    options or concurrently.
+
+    Keyword arguments:
+        - skip_default_values
+        - skip_default_const_values
+        - color
+        - formatter_width: wrap usage at this width instead of the terminal's
+        - prog: the program name of *parser*, instead of ``parser.prog``
+        - submit: a callable ``submit(subparser, subdata, prog)`` returning a
+          :class:`concurrent.futures.Future` of the extracted *subdata*.  The
+          subtrees of the subcommands of *parser* are extracted through it,
+          for example in a worker pool, and merged in the order of the
+          subcommands.  See :mod:`sphinxarg.parallel`.
+    """
+    submit = kwargs.get('submit')
     show_defaults = True
     if kwargs.get('skip_default_values', False) is True:
         show_defaults = False
@@ -128,6 +265,88 @@ def parse_parser(parser, data=None, **kwargs):
     if kwargs.get('skip_default_const_values', False) is True:
         show_defaults_const = False
 
+    width = kwargs.get('formatter_width')
+    color = kwargs.get('color', False)
+    prog = kwargs.get('prog') or parser.prog
+    if data is None:
+        data = _root_data(parser, prog, width, color)
+    elif not isinstance(data, ParserNode):
+        data = ParserNode.from_mapping(data)
+    root = data
+    data.description = _parser_attribute(parser, 'description')
+    data.epilog = _parser_attribute(parser, 'epilog')
+
+    # The tree is walked depth-first with an explicit stack rather than by
+    # recursion, so the depth of the subcommand tree is not limited by the
+    # interpreter's recursion limit.  Each entry holds the subcommands still to
+    # visit; a parser's own arguments are extracted once all of its subcommands
+    # have been, like a recursive walk would.  The program name of a subparser
+    # is derived from its parent's rather than set on the subparser.
+    #
+    # A parser object may be registered under several parents.  Its arguments
+    # and subcommands are looked up once and shared by the nodes of all its
+    # occurrences, which only differ in their usage and parent.  The parsers
+    # being visited are tracked to detect a parser that is its own subcommand.
+    index = root.index = PathIndex()
+    index.add((), root)
+    subcommand_lists = {}
+    action_groups = {}
+    visiting = {id(parser)}
+    stack = [(parser, data, prog, (), _subcommand_iterator(parser, subcommand_lists))]
+    pending = []
+    while stack:
+        parser, data, prog, path, subcommands = stack[-1]
+        subcommand = next(subcommands, None)
+        if subcommand is None:
+            stack.pop()
+            visiting.discard(id(parser))
+            if id(parser) not in action_groups:
+                action_groups[id(parser)] = _parse_action_groups(
+                    parser, data, show_defaults, show_defaults_const
+                )
+            data.action_groups = action_groups[id(parser)]
+            continue
+
+        subdata = _subcommand_data(data, prog, *subcommand, width=width, color=color)
+        if data.children is None:
+            data.children = []
+        data.children.append(subdata)
+
+        name, aliases, subaction = subcommand[:3]
+        subprog = f'{prog} {name}'
+        subpath = (*path, name)
+        index.add(subpath, subdata, aliases)
+        if submit is not None and data is root:
+            pending.append((
+                len(data.children) - 1,
+                subpath,
+                submit(subaction, subdata, subprog),
+            ))
+            continue
+        if id(subaction) in visiting:
+            msg = (
+                f'Cyclic subcommands: the parser of "{subprog}" is also the parser '
+                f'of an enclosing command'
+            )
+            raise ParserCycleException(msg)
+        visiting.add(id(subaction))
+        subdata.description = _parser_attribute(subaction, 'description')
+        subdata.epilog = _parser_attribute(subaction, 'epilog')
+        subcommands = _subcommand_iterator(subaction, subcommand_lists)
+        stack.append((subaction, subdata, subprog, subpath, subcommands))
+
+    for position, subpath, future in pending:
+        # A worker process returns a copy, which is attached in place of subdata
+        subdata = future.result()
+        subdata.parent = root
+        root.children[position] = subdata
+        index.update(subpath, subdata.index)
+        subdata.index = None
+    return root
+
+
+def _parse_action_groups(parser, data, show_defaults, show_defaults_const):
+    """Return the action groups of *parser*, or ``None`` if there are none."""
     # argparse stores the different groups as a list in parser._action_groups
     # the first element of the list holds the positional arguments, the
     # second the option arguments not in groups, and subsequent elements
@@ -150,7 +369,7 @@ def parse_parser(parser, data=None, **kwargs):
                 default = f"'{default}'"
 
             # fill in any formatters, like %(default)s
-            format_dict = dict(vars(action), prog=data.get('prog', ''), default=default)
+            format_dict = dict(vars(action), prog=data.prog or '', default=default)
             format_dict['default'] = default
             help_str = action.help or ''  # Ensure we don't print None
             with contextlib.suppress(Exception):
@@ -165,40 +384,26 @@ def parse_parser(parser, data=None, **kwargs):
                 continue
 
             if isinstance(action, _StoreConstAction):
-                option = {
-                    'name': name,
-                    'default': default if show_defaults_const else '==SUPPRESS==',
-                    'help': help_str,
-                }
+                shown = show_defaults_const
             else:
-                option = {
-                    'name': name,
-                    'default': default if show_defaults else '==SUPPRESS==',
-                    'help': help_str,
-                }
-            if action.choices:
-                option['choices'] = action.choices
-            if '==SUPPRESS==' not in option['help']:
-                options_list.append(option)
+                shown = show_defaults
+            if '==SUPPRESS==' not in help_str:
+                options_list.append(
+                    ArgumentOption(
+                        name,
+                        default if shown else '==SUPPRESS==',
+                        help_str,
+                        action.choices or None,
+                    )
+                )
 
         if len(options_list) == 0:
             continue
 
         # Upper case "Positional Arguments" and "Named Arguments" titles
-        if action_group.title == 'options':
-            action_group.title = 'Named Arguments'
-        if action_group.title == 'positional arguments':
-            action_group.title = 'Positional Arguments'
-
-        group = {
-            'title': action_group.title,
-            'description': action_group.description,
-            'options': options_list,
-        }
-
-        action_groups.append(group)
+        title = _GROUP_TITLES.get(action_group.title, action_group.title)
+        action_groups.append(ActionGroup(title, action_group.description, options_list))
 
     if len(action_groups) > 0:
-        data['action_groups'] = action_groups
-
-    return data
+        return action_groups
+    return None
@@ -0,0 +1,211 @@
+"""JSON snapshots of extracted parser trees.
+
+A snapshot holds the tree returned by :func:`~sphinxarg.parser.parse_parser`
+(or :func:`~sphinxarg.parser.parse_parser_path`) together with the schema
+version, the version of sphinx-argparse that wrote it, a fingerprint of the
+extraction options and source files, and a description of the source::
+
+    {
+      "schema_version": 1,
+      "sphinxarg_version": "0.6.0",
+      "fingerprint": "…",
+      "source": {"module": "…", "func": "…", …},
+      "tree": {"name": "", "usage": "…", …, "children": [{…}, …]}
+    }
+
+Nodes have the keys of the extracted tree, except ``parent``: children are
+nested in their parent's ``children``.  The root of a sub-command extracted
+by path has the ``name``, ``prog`` and ``identifier`` of the parsers above it
+in ``ancestors``, outermost first.  Defaults and choices which are not JSON
+values are written as their string, which is how they are rendered.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING
+
+from sphinxarg import __version__
+from sphinxarg.model import ActionGroup, ArgumentOption, ParserNode, PathIndex
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from typing import IO, Any
+
+SCHEMA_VERSION = 1
+
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def _json_value(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def _plain_action_groups(action_groups: list[ActionGroup]) -> list[dict[str, Any]]:
+    plain = []
+    for group in action_groups:
+        options = []
+        for option in group.options:
+            entry = option.to_dict()
+            entry['default'] = _json_value(option.default)
+            if option.choices is not None:
+                entry['choices'] = [_json_value(choice) for choice in option.choices]
+            options.append(entry)
+        plain.append({
+            'title': group.title,
+            'description': group.description,
+            'options': options,
+        })
+    return plain
+
+
+def _ancestors(node: ParserNode) -> list[dict[str, Any]]:
+    ancestors = []
+    parent = node.parent
+    while parent is not None:
+        ancestors.append({
+            'name': parent.name,
+            'prog': parent.prog,
+            'identifier': parent.identifier,
+        })
+        parent = parent.parent
+    ancestors.reverse()
+    return ancestors
+
+
+def iter_tree_json(tree: ParserNode) -> Iterator[str]:
+    """Yield the JSON encoding of *tree* in chunks, one or a few per node."""
+    # An explicit stack of nodes and the JSON text between them, so neither
+    # the whole document nor a plain copy of the tree is built in memory
+    pending: list[ParserNode | str] = [tree]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, str):
+            yield item
+            continue
+        fields = []
+        for key, value in item.items():
+            if key in {'parent', 'children'}:
+                continue
+            if key == 'action_groups':
+                value = _plain_action_groups(value)
+            fields.append(f'{_encode(key)}: {_encode(value)}')
+        if item is tree and tree.parent is not None:
+            fields.append(f'"ancestors": {_encode(_ancestors(tree))}')
+        if not item.children:
+            yield '{' + ', '.join(fields) + '}'
+            continue
+        yield '{' + ', '.join(fields) + ', "children": ['
+        pending.append(']}')
+        for i in reversed(range(len(item.children))):
+            pending.append(item.children[i])
+            if i:
+                pending.append(', ')
+
+
+def dump_snapshot(
+    tree: ParserNode,
+    fp: IO[str],
+    *,
+    fingerprint: str | None = None,
+    source: dict[str, Any] | None = None,
+) -> None:
+    """Write a snapshot of *tree* to the text file *fp*, streaming the tree."""
+    header = {
+        'schema_version': SCHEMA_VERSION,
+        'sphinxarg_version': __version__,
+        'fingerprint': fingerprint,
+        'source': source or {},
+    }
+    fp.write(_encode(header)[:-1] + ', "tree": ')
+    for chunk in iter_tree_json(tree):
+        fp.write(chunk)
+    fp.write('}\n')
+
+
+def load_snapshot(fp: IO[str]) -> dict[str, Any]:
+    """Read a snapshot written by :func:`dump_snapshot`.
+
+    The returned dictionary holds the snapshot's fields; its ``tree`` is
+    rebuilt as a :class:`~sphinxarg.model.ParserNode` with parents and a path
+    index, like a freshly extracted tree.  :exc:`ValueError` is raised for a
+    snapshot of another schema version.
+    """
+    document = json.load(fp)
+    version = document.get('schema_version') if isinstance(document, dict) else None
+    if version != SCHEMA_VERSION:
+        msg = (
+            f'Unsupported parser snapshot schema version {version!r}, '
+            f'expected {SCHEMA_VERSION}'
+        )
+        raise ValueError(msg)
+    document['tree'] = _tree_from_json(document['tree'])
+    return document
+
+
+def _node_from_json(data: dict[str, Any], parent: ParserNode | None) -> ParserNode:
+    node = ParserNode(
+        data['name'],
+        data['usage'],
+        data['bare_usage'],
+        prog=data.get('prog'),
+        help=data.get('help'),
+        parent=parent,
+        identifier=data.get('identifier'),
+    )
+    node.description = data.get('description')
+    node.epilog = data.get('epilog')
+    if 'action_groups' in data:
+        node.action_groups = [
+            ActionGroup(
+                group['title'],
+                group['description'],
+                [
+                    ArgumentOption(
+                        option['name'],
+                        option['default'],
+                        option['help'],
+                        option.get('choices'),
+                    )
+                    for option in group['options']
+                ],
+            )
+            for group in data['action_groups']
+        ]
+    return node
+
+
+def _tree_from_json(data: dict[str, Any]) -> ParserNode:
+    parent = None
+    for ancestor in data.get('ancestors', ()):
+        # Only the names of the ancestors are used, for the command of the root
+        parent = ParserNode(
+            ancestor['name'],
+            '',
+            '',
+            prog=ancestor['prog'],
+            parent=parent,
+            identifier=ancestor['identifier'],
+        )
+    root = _node_from_json(data, parent)
+    index = root.index = PathIndex()
+    index.add((), root)
+    pending: list[tuple[dict[str, Any], ParserNode, tuple[str, ...]]] = [(data, root, ())]
+    while pending:
+        data, node, path = pending.pop()
+        if 'children' not in data:
+            continue
+        node.children = []
+        for child_data in data['children']:
+            child = _node_from_json(child_data, node)
+            node.children.append(child)
+            aliases = []
+            if child.identifier is not None:
+                # Aliased sub-commands are named 'name (alias, ...)'
+                aliases = child.name[len(child.identifier) + 2 : -1].split(', ')
+            child_path = (*path, child.identifier or child.name)
+            index.add(child_path, child, aliases)
+            pending.append((child_data, child, child_path))
+    return root
@@ -0,0 +1,470 @@
+"""Build argparse parsers from Python source without executing it.
+
+The module is parsed, and the statements building the parser are replayed on
+real argparse objects: ``ArgumentParser(...)``, ``add_argument(...)``,
+``add_argument_group(...)``, ``add_mutually_exclusive_group(...)``,
+``add_subparsers(...)``, ``add_parser(...)`` and ``set_defaults(...)`` calls,
+as long as their arguments are literals, argparse names or names bound to
+either.  Nothing else in the source is run.  Module level statements which
+don't use the parser are skipped; the names they may change, including values
+changed in place like by ``CHOICES.append(...)``, are forgotten.  So are the
+decorators, default values and class bodies run by function and class
+definitions.
+
+Anything that cannot be evaluated this way raises
+:exc:`DynamicCodeException`, after which the caller is expected to execute
+the source instead.
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import types
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, NoReturn
+
+#: Methods of argparse objects that may be called
+_METHODS = frozenset({
+    'add_argument',
+    'add_argument_group',
+    'add_mutually_exclusive_group',
+    'add_parser',
+    'add_subparsers',
+    'set_defaults',
+})
+
+#: argparse classes that may be instantiated
+_CLASSES = (argparse.ArgumentParser, argparse.FileType)
+
+#: Builtins that may be used, e.g. as ``type=``
+_BUILTINS = {builtin.__name__: builtin for builtin in (bool, complex, float, int, str)}
+
+#: argparse objects built by the interpreted code
+_ARGPARSE_OBJECTS = (argparse._ActionsContainer, argparse.Action)
+
+#: Values which cannot be changed in place, unlike lists, dictionaries and sets
+_IMMUTABLE = (str, bytes, int, float, complex, range, type(None), type, types.ModuleType)
+
+
+def _mutable_parts(value: Any) -> dict[int, Any]:
+    """Return the values reachable from *value* which can be changed in place, by id."""
+    parts: dict[int, Any] = {}
+    pending = [value]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, _IMMUTABLE) or id(value) in parts:
+            continue
+        if not isinstance(value, (tuple, frozenset)):
+            parts[id(value)] = value
+        if isinstance(value, dict):
+            pending.extend(value.keys())
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            pending.extend(value)
+    return parts
+
+
+class DynamicCodeException(Exception):  # noqa: N818
+    pass
+
+
+class _Interpreter:
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        #: Names with a known value
+        self.names: dict[str, Any] = {}
+        #: Functions defined at module level
+        self.functions: dict[str, ast.FunctionDef] = {}
+        #: Values of the defaults of those functions, evaluated when defining
+        #: them, or the reason they have no static value
+        self.defaults: dict[ast.expr, Any] = {}
+        #: All functions and classes defined at module level
+        self.definitions: dict[str, ast.stmt] = {}
+        #: Values given to argparse which can be changed in place, by id
+        self.captured: dict[int, Any] = {}
+
+    def fail(self, node: ast.AST, reason: str) -> NoReturn:
+        line = getattr(node, 'lineno', '?')
+        msg = f'{self.filename}:{line}: {reason}'
+        raise DynamicCodeException(msg)
+
+    def forget(self, name: str) -> None:
+        self.names.pop(name, None)
+        self.functions.pop(name, None)
+
+    # Expressions
+
+    def eval(self, node: ast.expr) -> Any:
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            items = self.eval_items(node.elts)
+            return {ast.List: list, ast.Tuple: tuple, ast.Set: set}[type(node)](items)
+        if isinstance(node, ast.Dict):
+            result = {}
+            for key, value in zip(node.keys, node.values, strict=True):
+                if key is None:
+                    result.update(self.eval(value))
+                else:
+                    result[self.eval(key)] = self.eval(value)
+            return result
+        if isinstance(node, ast.Name):
+            if node.id in self.names:
+                return self.names[node.id]
+            if node.id in _BUILTINS and node.id not in self.functions:
+                return _BUILTINS[node.id]
+            self.fail(node, f'name {node.id!r} has no static value')
+        if isinstance(node, ast.Attribute):
+            value = self.eval(node.value)
+            attr = node.attr
+            if value is argparse and not attr.startswith('_') and hasattr(argparse, attr):
+                return getattr(argparse, attr)
+            self.fail(node, f'attribute {node.attr!r} has no static value')
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            left, right = self.eval(node.left), self.eval(node.right)
+            if type(left) is type(right) and isinstance(left, (str, list, tuple)):
+                return left + right
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            value = self.eval(node.operand)
+            if isinstance(value, (int, float, complex)) and not isinstance(value, bool):
+                return -value
+        if isinstance(node, ast.JoinedStr):
+            return ''.join(self.eval_format(value) for value in node.values)
+        if isinstance(node, ast.Call):
+            return self.call(node)
+        self.fail(node, f'{type(node).__name__} expression is not evaluated statically')
+
+    def eval_or_reason(self, node: ast.expr) -> Any:
+        """Return the value of *node*, or the exception telling why it has none."""
+        try:
+            return self.eval(node)
+        except DynamicCodeException as exc:
+            return exc
+
+    def eval_items(self, nodes: list[ast.expr]) -> list[Any]:
+        items = []
+        for node in nodes:
+            if isinstance(node, ast.Starred):
+                items.extend(self.eval(node.value))
+            else:
+                items.append(self.eval(node))
+        return items
+
+    def eval_format(self, node: ast.expr) -> str:
+        if isinstance(node, ast.Constant):
+            assert isinstance(node.value, str)
+            return node.value
+        assert isinstance(node, ast.FormattedValue)
+        if node.conversion != -1 or node.format_spec is not None:
+            self.fail(node, 'formatted value with a conversion or format spec')
+        value = self.eval(node.value)
+        if not isinstance(value, (str, int, float)):
+            self.fail(node, f'formatted value of type {type(value).__name__}')
+        return str(value)
+
+    def call(self, node: ast.Call) -> Any:
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr in _METHODS:
+            target = self.eval(func.value)
+            if not isinstance(target, _ARGPARSE_OBJECTS) or not hasattr(target, func.attr):
+                self.fail(node, f'call of {func.attr!r} on a {type(target).__name__}')
+            callee = getattr(target, func.attr)
+        else:
+            callee = self.eval(func)
+            if callee not in _CLASSES:
+                self.fail(node, 'call of a function that is not part of argparse')
+        args = self.eval_items(node.args)
+        kwargs = {}
+        for keyword in node.keywords:
+            if keyword.arg is None:
+                kwargs.update(self.eval(keyword.value))
+            else:
+                kwargs[keyword.arg] = self.eval(keyword.value)
+        # argparse keeps defaults, choices... as given
+        for value in [*args, *kwargs.values()]:
+            self.captured.update(_mutable_parts(value))
+        try:
+            return callee(*args, **kwargs)
+        except Exception as exc:
+            # Executing the source reports the error with a proper traceback
+            self.fail(node, f'argparse raised {exc!r}')
+
+    # Statements
+
+    def bind(self, targets: list[ast.expr], value: Any, node: ast.stmt) -> None:
+        for target in targets:
+            if not isinstance(target, ast.Name):
+                self.fail(node, f'assignment to a {type(target).__name__}')
+            self.forget(target.id)
+            self.names[target.id] = value
+
+    def import_names(self, node: ast.Import | ast.ImportFrom) -> None:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name == 'argparse':
+                    self.forget(alias.asname or 'argparse')
+                    self.names[alias.asname or 'argparse'] = argparse
+                else:
+                    self.forget(alias.asname or alias.name.partition('.')[0])
+            return
+        for alias in node.names:
+            if node.module == 'argparse' and node.level == 0:
+                if alias.name == '*':
+                    for name in argparse.__all__:
+                        self.forget(name)
+                        self.names[name] = getattr(argparse, name)
+                    continue
+                if alias.name.startswith('_') or not hasattr(argparse, alias.name):
+                    self.fail(node, f'import of argparse.{alias.name}')
+                self.forget(alias.asname or alias.name)
+                self.names[alias.asname or alias.name] = getattr(argparse, alias.name)
+            elif alias.name == '*':
+                self.fail(node, f'star import from {node.module}')
+            else:
+                self.forget(alias.asname or alias.name)
+
+    def statement(self, node: ast.stmt) -> None:
+        """Run a statement which is part of building the parser."""
+        if isinstance(node, ast.Expr):
+            if isinstance(node.value, ast.Constant):
+                return  # A docstring
+            if not isinstance(node.value, ast.Call):
+                self.fail(node, f'{type(node.value).__name__} statement')
+            self.call(node.value)
+        elif isinstance(node, ast.Assign):
+            self.bind(node.targets, self.eval(node.value), node)
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            self.bind([node.target], self.eval(node.value), node)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            self.import_names(node)
+        elif not isinstance(node, ast.Pass):
+            self.fail(node, f'{type(node).__name__} statement')
+
+    def uses_parser(self, node: ast.AST) -> bool:
+        """Return whether *node* may modify an argparse object built so far."""
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load):
+                if child.id in self.functions:
+                    return True
+                if isinstance(self.names.get(child.id), _ARGPARSE_OBJECTS):
+                    return True
+            elif isinstance(child, ast.Global):
+                return True
+        return False
+
+    def module(self, tree: ast.Module) -> None:
+        """Run the module level statements.
+
+        Statements which don't touch the parser are skipped; the names they
+        bind are forgotten, so using them fails.
+        """
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.definitions[node.name] = node
+                self.define(node)
+            elif _is_main_block(node):
+                continue
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                self.import_names(node)
+            elif isinstance(node, (ast.Expr, ast.Assign, ast.AnnAssign)):
+                try:
+                    self.statement(node)
+                except DynamicCodeException:
+                    if self.uses_parser(node):
+                        raise
+                    self.skip(node)
+            elif self.uses_parser(node):
+                self.fail(node, f'{type(node).__name__} statement using the parser')
+            else:
+                self.skip(node)
+
+    def define(self, node: ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef) -> None:
+        """Define the module level function or class *node*.
+
+        Defining it runs its decorators and default values, or its class body,
+        which are skipped like statements unless they use the parser.  The
+        defaults of a function are evaluated here rather than when it's called.
+        """
+        if isinstance(node, ast.ClassDef):
+            parts: list[ast.AST] = [
+                *node.decorator_list,
+                *node.bases,
+                *node.keywords,
+                *node.body,
+            ]
+        else:
+            kw_defaults = [default for default in node.args.kw_defaults if default is not None]
+            defaults = [*node.args.defaults, *kw_defaults]
+            parts = [*node.decorator_list, *defaults]
+        for part in parts:
+            if self.uses_parser(part):
+                self.fail(part, f'{type(node).__name__} statement using the parser')
+        if isinstance(node, ast.FunctionDef) and not node.decorator_list:
+            # Calling the function fails if a default it uses has no static value
+            self.defaults.update(
+                (default, self.eval_or_reason(default)) for default in defaults
+            )
+            parts = [
+                default
+                for default in defaults
+                if isinstance(self.defaults[default], DynamicCodeException)
+            ]
+        for part in parts:
+            self.forget_changed(part)
+        self.forget(node.name)
+        if isinstance(node, ast.FunctionDef) and not node.decorator_list:
+            self.functions[node.name] = node
+
+    def skip(self, node: ast.stmt) -> None:
+        """Forget the names which the skipped statement *node* may change."""
+        self.forget_changed(node)
+        self.forget_bound(node)
+
+    def forget_changed(self, node: ast.AST) -> None:
+        """Forget the values which running *node* may change in place.
+
+        Those are the values of the names it uses, and of those used by the
+        module level functions and classes it refers to.  Such values are
+        forgotten under every name referencing them; a value given to argparse
+        cannot be forgotten, so changing it fails.  Names declared global are
+        forgotten as well.
+        """
+        used, declared = self.names_used(node)
+        changed: dict[int, Any] = {}
+        for name in used | declared:
+            if name in self.names:
+                changed.update(_mutable_parts(self.names[name]))
+        if changed.keys() & self.captured.keys():
+            self.fail(node, 'statement which may change a value given to argparse')
+        if changed:
+            for name, value in list(self.names.items()):
+                if _mutable_parts(value).keys() & changed.keys():
+                    self.forget(name)
+        for name in declared:
+            self.forget(name)
+
+    def names_used(self, node: ast.AST) -> tuple[set[str], set[str]]:
+        """Return the names used and declared global by *node* and the definitions it uses."""
+        used: set[str] = set()
+        declared: set[str] = set()
+        pending = [node]
+        while pending:
+            for child in ast.walk(pending.pop()):
+                if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load):
+                    if child.id in self.definitions and child.id not in used:
+                        pending.append(self.definitions[child.id])
+                    used.add(child.id)
+                elif isinstance(child, (ast.Global, ast.Nonlocal)):
+                    declared.update(child.names)
+        return used, declared
+
+    def forget_bound(self, node: ast.stmt) -> None:
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name) and not isinstance(child.ctx, ast.Load):
+                self.forget(child.id)
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.forget(child.name)
+            elif isinstance(child, (ast.Import, ast.ImportFrom)):
+                for alias in child.names:
+                    self.forget(alias.asname or alias.name.partition('.')[0])
+
+    def function(self, node: ast.FunctionDef, passparser: bool) -> Any:
+        """Return the result of calling the function *node*."""
+        arguments = node.args
+        positional = [*arguments.posonlyargs, *arguments.args]
+        defaults = [None] * (len(positional) - len(arguments.defaults)) + arguments.defaults
+        module_names = self.names
+        self.names = dict(module_names)
+        try:
+            parser = None
+            for i, (argument, default) in enumerate(zip(positional, defaults, strict=True)):
+                if i == 0 and passparser:
+                    parser = self.names[argument.arg] = argparse.ArgumentParser()
+                elif default is None:
+                    self.fail(node, f'argument {argument.arg!r} without a default')
+                else:
+                    self.names[argument.arg] = self.default(default)
+            if passparser and parser is None:
+                self.fail(node, 'function without an argument for the parser')
+            for argument, default in zip(
+                arguments.kwonlyargs, arguments.kw_defaults, strict=True
+            ):
+                if default is None:
+                    self.fail(node, f'argument {argument.arg!r} without a default')
+                self.names[argument.arg] = self.default(default)
+            if arguments.vararg is not None:
+                self.names[arguments.vararg.arg] = ()
+            if arguments.kwarg is not None:
+                self.names[arguments.kwarg.arg] = {}
+
+            result = None
+            for statement in node.body:
+                if isinstance(statement, ast.Return):
+                    if statement.value is not None:
+                        result = self.eval(statement.value)
+                    break
+                self.statement(statement)
+            return parser if passparser else result
+        finally:
+            self.names = module_names
+
+    def default(self, node: ast.expr) -> Any:
+        """Return the value of the default *node*, evaluated with its function."""
+        value = self.defaults[node]
+        if isinstance(value, DynamicCodeException):
+            raise value
+        return value
+
+
+def _is_main_block(node: ast.stmt) -> bool:
+    """Return whether *node* is ``if __name__ == '__main__':``."""
+    if not isinstance(node, ast.If) or node.orelse:
+        return False
+    test = node.test
+    return (
+        isinstance(test, ast.Compare)
+        and isinstance(test.left, ast.Name)
+        and test.left.id == '__name__'
+        and len(test.ops) == 1
+        and isinstance(test.ops[0], ast.Eq)
+        and isinstance(test.comparators[0], ast.Constant)
+        and test.comparators[0].value == '__main__'
+    )
+
+
+def static_parser(
+    source: str, attr_name: str, passparser: bool = False, filename: str = '<unknown>'
+) -> argparse.ArgumentParser:
+    """Return the parser made by *attr_name* in the Python *source*.
+
+    *attr_name* is a function returning a parser (or filling in a given one,
+    with *passparser*), or a module level parser.  Raises
+    :exc:`DynamicCodeException` if the parser cannot be built statically.
+    """
+    try:
+        tree = ast.parse(source, filename)
+    except SyntaxError as exc:
+        msg = f'{filename}: {exc}'
+        raise DynamicCodeException(msg) from None
+    interpreter = _Interpreter(filename)
+    interpreter.module(tree)
+    if attr_name in interpreter.functions:
+        result = interpreter.function(interpreter.functions[attr_name], passparser)
+    else:
+        result = interpreter.names.get(attr_name)
+    if not isinstance(result, argparse.ArgumentParser):
+        msg = f'{filename}: {attr_name!r} is not a statically built parser'
+        raise DynamicCodeException(msg)
+    return result
+
+
+def load_static(
+    filename: str, attr_name: str, passparser: bool = False, display_name: str | None = None
+) -> argparse.ArgumentParser:
+    """Like :func:`static_parser`, for the Python file *filename*."""
+    source = Path(filename).read_text()
+    return static_parser(source, attr_name, passparser, display_name or filename)
@@ -0,0 +1,165 @@
+"""Timing of the phases of ``argparse`` directives.
+
+Enabled with ``sphinxarg_timing``, every directive records the time spent in
+each of :data:`PHASES` in a :class:`DirectiveTiming`:
+
+``import``
+    importing the module (with mocks), executing the ``:filename:`` or reading
+    a ``:snapshot:``
+``factory``
+    calling the parser factory, or building the parser statically
+``parse``
+    ``parse_parser`` (with worker processes, the whole extraction)
+``navigate``
+    ``parser_navigate`` for a ``:path:`` in an already extracted tree
+``render``
+    rendering the parser tree and the directive content into nodes
+``unique_ids``
+    ``ensure_unique_ids``
+``domain``
+    registering commands in the ``argparse`` domain
+
+Time spent in a phase nested in another one, like registering sub-commands in
+the domain while rendering them, only counts for the inner phase.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import operator
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Iterable
+    from typing import Any
+
+PHASES = ('import', 'factory', 'parse', 'navigate', 'render', 'unique_ids', 'domain')
+
+
+class DirectiveTiming:
+    """The time spent in each phase by one directive."""
+
+    __slots__ = ('_current', '_since', 'docname', 'label', 'lineno', 'phases')
+
+    def __init__(self, docname: str, lineno: int, label: str) -> None:
+        self.docname = docname
+        self.lineno = lineno
+        self.label = label
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self._current: str | None = None
+        self._since = 0.0
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        """Count the time spent in the ``with`` block for the phase *name*."""
+        outer, now = self._current, time.perf_counter()
+        if outer is not None:
+            self.phases[outer] += now - self._since
+        self._current, self._since = name, now
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.phases[name] += now - self._since
+            self._current, self._since = outer, now
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'docname': self.docname,
+            'lineno': self.lineno,
+            'label': self.label,
+            'total': self.total,
+            'phases': self.phases,
+        }
+
+
+class _NoTiming:
+    """Stands in for a :class:`DirectiveTiming` when timing is disabled."""
+
+    __slots__ = ()
+
+    def phase(self, name: str) -> contextlib.nullcontext[None]:
+        return _NO_PHASE
+
+
+_NO_PHASE = contextlib.nullcontext()
+
+#: The timing of directives when timing is disabled
+NO_TIMING = _NoTiming()
+
+
+def _documents(timings: Iterable[DirectiveTiming]) -> list[tuple[str, float, int]]:
+    """Return the docname, total time and number of directives per document, slowest first."""
+    documents: dict[str, tuple[float, int]] = {}
+    for timing in timings:
+        total, count = documents.get(timing.docname, (0.0, 0))
+        documents[timing.docname] = (total + timing.total, count + 1)
+    return sorted(
+        ((docname, total, count) for docname, (total, count) in documents.items()),
+        key=operator.itemgetter(1),
+        reverse=True,
+    )
+
+
+def _phase_totals(timings: Iterable[DirectiveTiming]) -> dict[str, float]:
+    totals = dict.fromkeys(PHASES, 0.0)
+    for timing in timings:
+        for name, seconds in timing.phases.items():
+            totals[name] += seconds
+    return totals
+
+
+def _format_phases(phases: dict[str, float]) -> str:
+    return ', '.join(f'{name} {seconds:.3f}s' for name, seconds in phases.items() if seconds)
+
+
+def summarize(timings: list[DirectiveTiming], top: int = 10) -> list[str]:
+    """Return the lines of a summary of *timings*.
+
+    The summary holds the totals per phase, and the *top* slowest documents and
+    directives.
+    """
+    totals = _phase_totals(timings)
+    documents = _documents(timings)
+    lines = [
+        f'{len(timings)} directives in {len(documents)} documents took '
+        f'{sum(totals.values()):.3f}s: {_format_phases(totals)}',
+        'slowest documents:',
+    ]
+    lines.extend(
+        f'  {total:8.3f}s  {docname} ({count} directives)'
+        for docname, total, count in documents[:top]
+    )
+    lines.append('slowest directives:')
+    slowest = sorted(timings, key=lambda timing: timing.total, reverse=True)[:top]
+    lines.extend(
+        f'  {timing.total:8.3f}s  {timing.docname}:{timing.lineno} {timing.label} '
+        f'({_format_phases(timing.phases)})'
+        for timing in slowest
+    )
+    return lines
+
+
+def write_report(timings: list[DirectiveTiming], path: str) -> None:
+    """Write *timings* as JSON to *path*: totals, documents and directives, slowest first."""
+    totals = _phase_totals(timings)
+    report = {
+        'total': sum(totals.values()),
+        'phases': totals,
+        'documents': [
+            {'docname': docname, 'total': total, 'directives': count}
+            for docname, total, count in _documents(timings)
+        ],
+        'directives': [
+            timing.to_dict()
+            for timing in sorted(timings, key=lambda timing: timing.total, reverse=True)
+        ],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
@@ -1,7 +1,19 @@
-def command_pos_args(result: dict) -> str:
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from sphinxarg.model import ParserNode
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+
+def command_pos_args(result: Mapping) -> str:
     """Returns the command up to the positional arg a string
     that is suitable for the text in the command index.
 
+    For a :class:`~sphinxarg.model.ParserNode` the precomputed command is returned.
+
     >>> x, y, z = {}, {}, {}
     >>> x['prog']='simple-command'
     >>> command_pos_args(x)
@@ -20,17 +32,22 @@ def command_pos_args(result: dict) -> str:
     >>> command_pos_args("blah")
     ''
     """
-    ret = ''
-
-    if 'name' in result and result['name'] != '':
-        ret += f'{result["name"]}'
-    elif 'prog' in result and result['prog'] != '':
-        ret += f'{result["prog"]}'
+    if isinstance(result, ParserNode):
+        return result.command
 
-    if 'parent' in result:
-        ret = command_pos_args(result['parent']) + ' ' + ret
+    parts = []
+    while True:
+        if 'name' in result and result['name'] != '':
+            parts.append(f'{result["name"]}')
+        elif 'prog' in result and result['prog'] != '':
+            parts.append(f'{result["prog"]}')
+        else:
+            parts.append('')
+        if 'parent' not in result:
+            break
+        result = result['parent']
 
-    return ret
+    return ' '.join(reversed(parts))
 
 
 def target_to_anchor_id(target: str) -> str:
@@ -0,0 +1 @@
+extensions = ['sphinxarg.ext']
@@ -0,0 +1,2 @@
+extensions = ['sphinxarg.ext']
+sphinxarg_formatter_width = 80
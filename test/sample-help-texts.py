@@ -0,0 +1,9 @@
+import argparse
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--old', help='An old option.\n\n.. versionadded:: 1.0')
+parser.add_argument('--link', help='See `the manual <https://example.org>`_.')
+parser.add_argument('--emphasis', help='Some *emphasis*.')
+
+references = argparse.ArgumentParser()
+references.add_argument('--helper', help='Calls :func:`helper`.')
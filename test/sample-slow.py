@@ -0,0 +1,12 @@
+import argparse
+import os
+import time
+
+
+def get_parser():
+    time.sleep(float(os.environ.get('SPHINXARG_TEST_DELAY', '0')))
+    if 'SPHINXARG_TEST_ERROR' in os.environ:
+        raise TimeoutError(os.environ['SPHINXARG_TEST_ERROR'])
+    parser = argparse.ArgumentParser(prog='sample-slow', description='A slow parser factory')
+    parser.add_argument('--quick', action='store_true', help='Not slow at all')
+    return parser
@@ -0,0 +1,139 @@
+import sys
+import threading
+
+import pytest
+
+from sphinxarg.loader import LoaderSession, _LoadTimeoutError, call_with_timeout
+
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch):
+    """Write modules to a directory on ``sys.path``, removing them afterwards."""
+    monkeypatch.syspath_prepend(str(tmp_path))
+    names = []
+
+    def write(name, source):
+        (tmp_path / f'{name}.py').write_text(source, encoding='utf-8')
+        names.append(name)
+        return tmp_path / f'{name}.py'
+
+    yield write
+    for name in names:
+        sys.modules.pop(name, None)
+
+
+CLI_SOURCE = """
+import argparse
+import not_installed_dep
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog={prog!r})
+    parser.add_argument('--level', default=not_installed_dep.DEFAULT_LEVEL)
+    return parser
+"""
+
+
+def test_session_mocks_once(modules):
+    modules('session_cli_a', CLI_SOURCE.format(prog='a'))
+    modules('session_cli_b', CLI_SOURCE.format(prog='b'))
+    session = LoaderSession()
+    mocks = ('not_installed_dep',)
+
+    factory = session.import_factory('session_cli_a', 'get_parser', mocks)
+    assert session.import_factory('session_cli_a', 'get_parser', mocks) is factory
+    session.import_factory('session_cli_b', 'get_parser', mocks)
+
+    # One finder, one mock module, which is not left in sys.modules
+    assert len(session._finders) == 1
+    assert 'not_installed_dep' not in sys.modules
+    module_a, module_b = sys.modules['session_cli_a'], sys.modules['session_cli_b']
+    assert module_a.not_installed_dep is module_b.not_installed_dep
+    assert factory().prog == 'a'
+    assert session.conflicts() == []
+
+    session.clear()
+    assert session.factories == {}
+    assert session._mock_modules == {}
+
+
+def test_session_abandons_mocks(modules):
+    modules('session_slow', 'import time\nimport heavydep\ntime.sleep(0.5)\n')
+    session = LoaderSession()
+
+    with pytest.raises(_LoadTimeoutError):
+        call_with_timeout(session.import_factory, 0.1, 'session_slow', 'f', ('heavydep',))
+    session.abandon_mocks()
+
+    def mocked():
+        return 'heavydep' in sys.modules or any(
+            type(finder).__name__ == 'MockFinder' for finder in sys.meta_path
+        )
+
+    assert not mocked()
+    for thread in threading.enumerate():
+        if thread.name == 'sphinxarg-factory':
+            thread.join()
+    # The abandoned import leaves the mocks of later imports alone
+    assert not mocked()
+    assert session._finders == {}
+
+
+def test_session_reports_conflicts(modules):
+    modules('session_heavy', 'DEFAULT_LEVEL = 3\n')
+    script = modules('session_script', 'import session_heavy\nget_parser = None\n')
+    cli_source = CLI_SOURCE.format(prog='cli').replace('not_installed_dep', 'session_heavy')
+    modules('session_cli', cli_source)
+    session = LoaderSession()
+
+    session.exec_factory(str(script), 'get_parser')
+    assert 'session_heavy' in session.imported_without_mocks
+    session.import_factory('session_cli', 'get_parser', ('session_heavy',))
+
+    # The script imported the real module, so it wasn't mocked for session_cli
+    assert session.conflicts() == ['session_heavy']
+    assert session.import_factory('session_cli', 'get_parser', ())().get_default('level') == 3
+
+
+def test_session_records_imports(modules):
+    modules('session_options', 'NAMES = ["--level"]\n')
+    modules('session_tool', 'import session_options\nget_parser = None\n')
+    script = modules('session_tool_script', 'import session_tool\nget_parser = None\n')
+    session = LoaderSession()
+
+    session.import_factory('session_tool', 'get_parser')
+    session.exec_factory(str(script), 'get_parser')
+
+    assert {'session_tool', 'session_options'} <= session.imports['session_tool']
+    # Modules imported before are not imported by the script
+    assert session.imports[str(script)] == set()
+
+
+def test_session_executes_files_once(modules, monkeypatch):
+    modules('session_counter', 'runs = 0\n')
+    script = modules(
+        'session_multi',
+        'import session_counter\nsession_counter.runs += 1\nparser_a = "a"\nparser_b = "b"\n',
+    )
+    compiled = []
+    monkeypatch.setattr(
+        'sphinxarg.loader.compile',
+        lambda *args: compiled.append(args) or compile(*args),
+        raising=False,
+    )
+    session = LoaderSession()
+
+    assert session.exec_factory(str(script), 'parser_a') == 'a'
+    assert session.exec_factory(str(script), 'parser_b') == 'b'
+    assert sys.modules['session_counter'].runs == 1
+    assert len(compiled) == 1
+
+    # A new build executes the file again, but reuses the code object
+    session.clear()
+    session.exec_factory(str(script), 'parser_a')
+    assert sys.modules['session_counter'].runs == 2
+    assert len(compiled) == 1
+
+    script.write_text(script.read_text() + 'parser_c = "c"\n', encoding='utf-8')
+    assert session.exec_factory(str(script), 'parser_c') == 'c'
+    assert sys.modules['session_counter'].runs == 3
+    assert len(compiled) == 2
@@ -0,0 +1,104 @@
+import argparse
+import json
+import pickle
+
+from sphinxarg.model import ActionGroup, ArgumentOption, ParserNode
+from sphinxarg.parser import parse_parser, parser_navigate
+from sphinxarg.utils import command_pos_args
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='under-test', description='described')
+    parser.add_argument('--move', choices=['rock', 'paper'], help='move help')
+    subparser = parser.add_subparsers().add_parser('install', aliases=['i'], help=None)
+    subparser.add_subparsers().add_parser('now')
+    return parser
+
+
+def test_records_are_slotted():
+    data = parse_parser(_parser())
+
+    assert isinstance(data, ParserNode)
+    assert isinstance(data['action_groups'][0], ActionGroup)
+    assert isinstance(data['action_groups'][0]['options'][0], ArgumentOption)
+    for record in (data, data['action_groups'][0], data['action_groups'][0]['options'][0]):
+        assert not hasattr(record, '__dict__')
+
+
+def test_mapping_keys():
+    data = parse_parser(_parser())
+    child = data['children'][0]
+
+    assert list(data) == [
+        'name',
+        'usage',
+        'bare_usage',
+        'prog',
+        'description',
+        'children',
+        'action_groups',
+    ]
+    assert list(child) == [
+        'name',
+        'help',
+        'usage',
+        'bare_usage',
+        'parent',
+        'identifier',
+        'children',
+    ]
+    # An explicit help=None is kept, like in the historical dictionaries
+    assert child['help'] is None
+    assert 'epilog' not in data
+    assert data.get('epilog') is None
+    assert child['parent'] == {'name': '', 'prog': 'under-test'}
+    assert child['children'][0]['parent'] == {
+        'name': 'install (i)',
+        'prog': '',
+        'parent': {'name': '', 'prog': 'under-test'},
+    }
+
+
+def test_data_dict_is_converted():
+    parser = argparse.ArgumentParser(prog='under-test install', description='installs')
+    data = {
+        'name': 'install',
+        'help': 'install help',
+        'usage': 'usage: under-test install [-h]',
+        'bare_usage': 'under-test install [-h]',
+        'parent': {'name': '', 'prog': 'under-test'},
+    }
+
+    node = parse_parser(parser, data=data)
+
+    assert isinstance(node, ParserNode)
+    assert node == {**data, 'description': 'installs'}
+    assert node.command == 'under-test install'
+
+
+def test_to_dict_and_json():
+    data = parse_parser(_parser())
+    plain = data.to_dict()
+
+    assert type(plain) is dict
+    assert type(plain['children'][0]['parent']) is dict
+    assert plain == data
+    assert json.loads(json.dumps(plain)) == data
+
+
+def test_command_precomputed():
+    data = parse_parser(_parser())
+    leaf = parser_navigate(data, 'install now')
+
+    assert leaf.command == 'under-test install (i) now'
+    assert command_pos_args(leaf) == leaf.command
+    # The same result as walking the historical dictionaries
+    assert command_pos_args(leaf.to_dict()) == leaf.command
+
+
+def test_pickle_roundtrip():
+    data = parse_parser(_parser())
+    restored = pickle.loads(pickle.dumps(data))
+
+    assert restored == data
+    assert restored['children'][0].parent is restored
@@ -0,0 +1,122 @@
+import argparse
+import sys
+from pathlib import Path
+
+import pytest
+
+from sphinxarg.loader import FactoryNotFoundError, ParserSource
+from sphinxarg.parallel import extract_isolated, shutdown_executor, subtree_submitter
+from sphinxarg.parser import parse_parser, parse_parser_path, parser_navigate
+
+SAMPLE = Path(__file__).parent / 'sample-directive-opts.py'
+
+
+def _nested_parser():
+    parser = argparse.ArgumentParser(prog='test_parallel')
+    subparsers = parser.add_subparsers()
+    for name in ('one', 'two', 'three'):
+        child = subparsers.add_parser(name, aliases=[name.upper()], help=f'{name} help')
+        child.add_argument('--level', default=name, help='%(prog)s at %(default)s')
+        grandchildren = child.add_subparsers()
+        for subname in ('x', 'y'):
+            grandchildren.add_parser(subname, description=f'{name} {subname}')
+    return parser
+
+
+@pytest.fixture
+def pool():
+    yield
+    shutdown_executor()
+
+
+def test_thread_extraction_matches_serial(pool):
+    serial = parse_parser(_nested_parser())
+    submit = subtree_submitter('thread', 2, None, '')
+    result = parse_parser(_nested_parser(), submit=submit)
+
+    assert result == serial
+    assert [child['name'] for child in result['children']] == [
+        'one (ONE)',
+        'two (TWO)',
+        'three (THREE)',
+    ]
+    assert all(child.parent is result for child in result['children'])
+    assert result.index.nodes.keys() == serial.index.nodes.keys()
+    assert parser_navigate(result, 'TWO y') is result['children'][1]['children'][1]
+
+
+@pytest.mark.parametrize('path', ['', 'A'])
+def test_process_extraction_matches_serial(pool, path):
+    source = ParserSource('filename', str(SAMPLE), 'get_parser')
+    serial = parse_parser_path(source.load(), path, prog='parallel')
+    submit = subtree_submitter('process', 2, source, path, prog='parallel')
+    result = parse_parser_path(source.load(), path, submit=submit, prog='parallel')
+
+    assert result == serial
+    assert result.index.nodes.keys() == serial.index.nodes.keys()
+    for child in result.get('children', ()):
+        assert child.parent is result
+        assert result.index.nodes[(child.name,)] is child
+        assert child.command == f'parallel {child.name}'
+
+
+def test_serial_without_mode():
+    assert subtree_submitter(None, None, None, '') is None
+    with pytest.raises(ValueError, match='Unknown parallel extraction mode'):
+        subtree_submitter('fibers', None, None, '')
+
+
+@pytest.mark.sphinx(
+    'html',
+    testroot='parser-cache',
+    freshenv=True,
+    confoverrides={'sphinxarg_parallel_extraction': 'thread'},
+)
+def test_parallel_build(app):
+    app.build()
+
+    html = (app.outdir / 'index.html').read_text(encoding='utf-8')
+    assert 'B subparser' in html
+    assert app._warning.getvalue() == ''
+
+
+def test_isolated_extraction(pool, tmp_path, monkeypatch):
+    (tmp_path / 'isolated_cli.py').write_text(
+        'import argparse\n'
+        'def get_parser():\n'
+        '    parser = argparse.ArgumentParser(prog="isolated")\n'
+        '    parser.add_subparsers().add_parser("run", help="run help")\n'
+        '    return parser\n'
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    source = ParserSource('module', 'isolated_cli', 'get_parser')
+
+    result = extract_isolated(source, '', 1)
+    subtree = extract_isolated(source, 'run', 1, prog='tool')
+    # The module was only imported by the worker
+    assert 'isolated_cli' not in sys.modules
+
+    parser = source.load()
+    assert result == parse_parser(parser)
+    assert result.index.nodes[('run',)] is result.children[0]
+    assert subtree == parse_parser_path(parser, 'run', prog='tool')
+
+
+def test_isolated_extraction_errors(pool):
+    source = ParserSource('module', 'test.sample', 'no_such_parser')
+    with pytest.raises(FactoryNotFoundError, match='has no attribute "no_such_parser"'):
+        extract_isolated(source, '', 1)
+
+
+@pytest.mark.sphinx(
+    'html',
+    testroot='parser-cache',
+    freshenv=True,
+    confoverrides={'sphinxarg_extraction_processes': 1},
+)
+def test_isolated_build(app):
+    app.build()
+
+    html = (app.outdir / 'index.html').read_text(encoding='utf-8')
+    assert 'B subparser' in html
+    assert app._warning.getvalue() == ''
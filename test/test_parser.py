@@ -1,6 +1,21 @@
 import argparse
+import io
+import pickle
+import re
+import sys
+import types
 
-from sphinxarg.parser import parse_parser, parser_navigate
+import pytest
+
+import sphinxarg.parser
+from sphinxarg.parser import (
+    NavigationException,
+    ParserCycleException,
+    parse_parser,
+    parse_parser_path,
+    parser_navigate,
+)
+from sphinxarg.utils import command_pos_args
 
 
 def test_parse_options():
@@ -452,3 +467,283 @@ def test_action_groups_with_subcommands():
             },
         },
     ]
+
+
+def _nested_parser():
+    parser = argparse.ArgumentParser(prog='under-test', description='root')
+    subparsers1 = parser.add_subparsers()
+    subparser1 = subparsers1.add_parser('level1', aliases=['l1'], help='level1 help')
+    subparsers1.add_parser('sibling', help='sibling help').add_argument('--sib')
+
+    subparsers2 = subparser1.add_subparsers()
+    subparser2 = subparsers2.add_parser('level2', description='level2 description')
+    subparser2.add_argument('foo', help='%(prog)s foo help')
+    subparser2.add_subparsers().add_parser('level3')
+    return parser
+
+
+@pytest.mark.parametrize('path', ['', 'level1', 'level1 level2', 'level1 level2 level3'])
+def test_parse_parser_path_matches_navigation(path):
+    expected = parser_navigate(parse_parser(_nested_parser()), path)
+
+    assert parse_parser_path(_nested_parser(), path) == expected
+
+
+@pytest.mark.parametrize(
+    ('path', 'message'),
+    [
+        ('levl1', 'no child element with name: levl1 (path: ). Did you mean: level1?'),
+        ('level1 missing', 'no child element with name: missing (path: level1)'),
+        ('sibling level2', 'has no child elements.  (path: sibling)'),
+    ],
+)
+def test_parse_parser_path_errors(path, message):
+    with pytest.raises(NavigationException, match=re.escape(message)):
+        parser_navigate(parse_parser(_nested_parser()), path)
+    with pytest.raises(NavigationException, match=re.escape(message)):
+        parse_parser_path(_nested_parser(), path)
+
+
+@pytest.mark.parametrize('path', ['l1', 'l1 level2', 'level1 level2 level3'])
+def test_navigate_aliases_through_index(path):
+    data = parse_parser(_nested_parser())
+    canonical = path.replace('l1', 'level1', 1) if path.startswith('l1') else path
+    expected = parser_navigate(data.to_dict(), canonical)
+
+    assert parser_navigate(data, path) == expected
+    assert parse_parser_path(_nested_parser(), path) == expected
+
+
+def test_path_index_covers_tree():
+    data = parse_parser(_nested_parser())
+
+    assert set(data.index.nodes) == {
+        (),
+        ('level1',),
+        ('level1', 'level2'),
+        ('level1', 'level2', 'level3'),
+        ('sibling',),
+    }
+    assert data.index.aliases == {('l1',): 'level1'}
+    assert data.index.nodes[('level1', 'level2')] is data['children'][0]['children'][0]
+    assert sorted(data.index.names(())) == ['l1', 'level1', 'sibling']
+    # Only the node extraction started from holds an index
+    assert data['children'][0].index is None
+
+
+def test_parse_parser_path_skips_siblings():
+    parser = _nested_parser()
+    sibling = parser._subparsers._group_actions[0].choices['sibling']
+    sibling.format_usage = None  # would fail if the sibling was extracted
+
+    data = parse_parser_path(parser, 'level1 level2')
+
+    assert data['usage'] == 'usage: under-test level1 level2 [-h] foo {level3} ...'
+    assert data['action_groups'][0]['options'][0]['help'] == ' foo help'
+
+
+def _deep_parser(depth):
+    parser = argparse.ArgumentParser(prog='deep')
+    current = parser
+    for _ in range(depth):
+        current = current.add_subparsers().add_parser('sub')
+    current.add_argument('--leaf', help='leaf help')
+    return parser
+
+
+def test_parse_deep_tree_without_recursion():
+    depth = sys.getrecursionlimit() + 100
+    data = parse_parser(_deep_parser(depth))
+
+    leaf = parser_navigate(data, ' '.join(['sub'] * depth))
+    assert leaf['action_groups'][0]['options'][0]['name'] == ['--leaf']
+    assert leaf.command == ' '.join(['deep'] + ['sub'] * depth)
+    assert parse_parser_path(_deep_parser(depth), ['sub'] * depth)['usage'] == leaf['usage']
+
+
+def test_command_pos_args_deep_dictionaries():
+    data = {'prog': 'deep'}
+    for _ in range(sys.getrecursionlimit() + 100):
+        data = {'name': 'sub', 'parent': data}
+
+    assert command_pos_args(data) == ' '.join(
+        ['deep'] + ['sub'] * (sys.getrecursionlimit() + 100)
+    )
+
+
+def _wide_parser():
+    parser = argparse.ArgumentParser(prog='wide')
+    for i in range(12):
+        parser.add_argument(f'--option-{i}')
+    parser.add_argument('target')
+    parser.add_subparsers().add_parser('sub').add_argument('--flag')
+    return parser
+
+
+def test_short_usage_formatted_once(monkeypatch):
+    parser = _wide_parser()
+    calls = []
+    format_usage = argparse.HelpFormatter._format_usage
+
+    def counting_format_usage(self, *args, **kwargs):
+        calls.append(self._prog)
+        return format_usage(self, *args, **kwargs)
+
+    monkeypatch.setattr(argparse.HelpFormatter, '_format_usage', counting_format_usage)
+    parse_parser(parser, formatter_width=80)
+
+    # The wrapped usage is formatted with and without the prefix
+    assert calls == ['wide', 'wide', 'wide sub']
+
+
+def test_usage_matches_argparse(monkeypatch):
+    monkeypatch.setenv('COLUMNS', '80')
+    parser = _wide_parser()
+    data = parse_parser(parser)
+
+    # Wrapped like the usage argparse prints, which depends on the prefix
+    assert data['usage'] == parser.format_usage().strip()
+    assert data['bare_usage'].startswith('wide [-h] [--option-0 OPTION_0]')
+    assert len(data['bare_usage'].splitlines()) > 1
+    sub = data['children'][0]
+    assert sub['usage'] == 'usage: wide sub [-h] [--flag FLAG]'
+    assert sub['bare_usage'] == 'wide sub [-h] [--flag FLAG]'
+
+
+def test_usage_wrapped_with_prefix(monkeypatch):
+    # Wrapped at 80 columns, which the usage only fits without the prefix
+    monkeypatch.setenv('COLUMNS', '82')
+    parser = argparse.ArgumentParser(prog='sample-directive-special')
+    parser.add_argument('--some-int', type=int)
+    parser.add_argument('--some-text')
+
+    data = parse_parser(parser)
+
+    assert data['usage'] == parser.format_usage().strip()
+    assert data['usage'] == (
+        'usage: sample-directive-special [-h] [--some-int SOME_INT]\n'
+        '                                [--some-text SOME_TEXT]'
+    )
+    assert data['bare_usage'] == (
+        'sample-directive-special [-h] [--some-int SOME_INT] [--some-text SOME_TEXT]'
+    )
+
+
+def test_custom_usage_not_indented():
+    parser = argparse.ArgumentParser(prog='custom', usage='%(prog)s one\n  %(prog)s two')
+
+    data = parse_parser(parser)
+
+    assert data['usage'] == 'usage: custom one\n  custom two'
+    assert data['bare_usage'] == 'custom one\n  custom two'
+
+
+def test_formatter_width_ignores_terminal_size(monkeypatch):
+    monkeypatch.setenv('COLUMNS', '40')
+    narrow = parse_parser(_wide_parser())
+    fixed_narrow = parse_parser(_wide_parser(), formatter_width=120)
+    monkeypatch.setenv('COLUMNS', '200')
+    wide = parse_parser(_wide_parser())
+    fixed_wide = parse_parser(_wide_parser(), formatter_width=120)
+
+    assert narrow['bare_usage'] != wide['bare_usage']
+    assert fixed_narrow == fixed_wide
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """Pickle a parser, with functions and classes reduced to their names."""
+
+    def reducer_override(self, obj):
+        if obj is str:
+            return NotImplemented
+        if isinstance(obj, (type, types.FunctionType, types.BuiltinFunctionType)):
+            return str, (f'{obj.__module__}.{obj.__qualname__}',)
+        return NotImplemented
+
+
+def _snapshot(parser):
+    buffer = io.BytesIO()
+    _SnapshotPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(parser)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    'kwargs',
+    [
+        {},
+        {'color': True, 'formatter_width': 60},
+        {'prog': 'renamed', 'skip_default_values': True},
+    ],
+)
+def test_parser_not_modified(kwargs):
+    parser = _nested_parser()
+    parser.add_argument('positional', help='%(prog)s positional')
+    before = _snapshot(parser)
+
+    data = parse_parser(parser, **kwargs)
+    parse_parser_path(parser, 'level1 level2', **kwargs)
+
+    assert _snapshot(parser) == before
+    assert data['action_groups'][0]['title'] == 'Positional Arguments'
+
+
+def test_extract_again_with_other_options():
+    parser = _nested_parser()
+    renamed = parse_parser(parser, prog='renamed')
+    original = parse_parser(parser)
+
+    assert renamed['prog'] == 'renamed'
+    assert parser_navigate(renamed, 'level1').command == 'renamed level1 (l1)'
+    assert original == parse_parser(_nested_parser())
+
+
+def _shared_parser(resources, shared=True):
+    """Return a parser with a 'list' subcommand under every resource."""
+    parser = argparse.ArgumentParser(prog='dag')
+    resource_parsers = parser.add_subparsers()
+    list_parser = None
+    for resource in resources:
+        commands = resource_parsers.add_parser(resource).add_subparsers()
+        if list_parser is None or not shared:
+            list_parser = commands.add_parser('list', help='List them.')
+            list_parser.add_argument('--format', default='table', help='Output format.')
+            list_parser.add_subparsers().add_parser('all')
+        else:
+            commands._name_parser_map['list'] = list_parser
+            commands._choices_actions.append(argparse.Action([], 'list', help='List them.'))
+    return parser
+
+
+def test_shared_subparser_extracted_once(monkeypatch):
+    parse_action_groups = sphinxarg.parser._parse_action_groups
+    calls = []
+
+    def counting_parse_action_groups(parser, *args):
+        calls.append(parser.prog)
+        return parse_action_groups(parser, *args)
+
+    monkeypatch.setattr(sphinxarg.parser, '_parse_action_groups', counting_parse_action_groups)
+    resources = [f'resource{i}' for i in range(12)]
+    data = parse_parser(_shared_parser(resources))
+
+    # The root, the resources, 'list' and 'list all'
+    assert len(calls) == 1 + 12 + 2
+    monkeypatch.undo()
+    assert data == parse_parser(_shared_parser(resources, shared=False))
+    lists = [parser_navigate(data, f'{resource} list') for resource in resources]
+    assert [node.command for node in lists[:2]] == ['dag resource0 list', 'dag resource1 list']
+    assert lists[0]['usage'] == 'usage: dag resource0 list [-h] [--format FORMAT] {all} ...'
+    assert lists[1]['usage'] == 'usage: dag resource1 list [-h] [--format FORMAT] {all} ...'
+    assert lists[0]['action_groups'] is lists[1]['action_groups']
+
+
+def test_cyclic_subparsers():
+    parser = argparse.ArgumentParser(prog='cycle')
+    child = parser.add_subparsers().add_parser('child')
+    child.add_subparsers()._name_parser_map['parent'] = parser
+
+    with pytest.raises(ParserCycleException, match='"cycle child parent"'):
+        parse_parser(parser)
+    # Extraction starts at 'child', whose parser reappears below 'parent'
+    with pytest.raises(ParserCycleException, match='"cycle child parent child"'):
+        parse_parser_path(parser, 'child')
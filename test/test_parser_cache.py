@@ -0,0 +1,240 @@
+import sys
+from pathlib import Path
+
+import pytest
+from docutils import nodes
+from sphinx import addnodes
+
+from sphinxarg.cache import (
+    DiskCache,
+    FragmentCache,
+    ParserCache,
+    disk_cache,
+    fingerprint,
+    fragment_cache,
+    module_source_files,
+    parser_cache,
+)
+
+
+def test_parser_cache_counters():
+    cache = ParserCache()
+
+    assert cache.get('key') is None
+    cache.set('key', {'name': ''})
+    assert cache.get('key') == {'name': ''}
+    assert cache.get('key') == {'name': ''}
+
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert len(cache) == 1
+
+    cache.clear()
+    assert (cache.hits, cache.misses, len(cache)) == (0, 0, 0)
+
+
+@pytest.mark.sphinx('html', testroot='parser-cache', freshenv=True)
+def test_parser_extracted_once_per_build(app):
+    app.build()
+
+    # The subtree for :path: A is taken from the already extracted tree,
+    # the second directive for :path: A reuses it
+    assert len(parser_cache) == 2
+    assert parser_cache.misses == 2
+    assert parser_cache.hits == 1
+
+
+def test_fragment_cache_copies_and_evicts():
+    cache = FragmentCache()
+    assert not cache.enabled
+    cache.configure(2)
+
+    paragraph = nodes.paragraph(text='help')
+    cache.set('a', [paragraph])
+    paragraph += nodes.Text(' changed')
+    first = cache.get('a')
+    first[0] += nodes.Text(' again')
+    assert cache.get('a')[0].astext() == 'help'
+
+    cache.set('b', [])
+    cache.get('a')
+    cache.set('c', [])
+    # 'b' was the least recently used entry
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert (len(cache), cache.hits, cache.misses) == (2, 4, 1)
+
+
+@pytest.mark.sphinx('html', testroot='fragment-cache', freshenv=True)
+def test_fragment_cache_reuses_help_texts(app):
+    app.build()
+
+    # Default: ``False`` is rendered for three options, plain texts aren't cached
+    assert fragment_cache.hits > 0
+    assert fragment_cache.misses > 0
+    assert app._warning.getvalue() == ''
+
+
+@pytest.mark.sphinx('html', testroot='help-texts', freshenv=True)
+def test_directives_in_help_texts_run_once(app):
+    app.build()
+
+    # The link keeps the help texts from sharing a document, the directive must
+    # not run again when they are parsed one by one
+    changes = app.env.get_domain('changeset').get_changesets_for('1.0')
+    assert len(changes) == 1
+    assert app._warning.getvalue() == ''
+
+
+@pytest.mark.sphinx('html', testroot='help-texts', freshenv=True)
+def test_fragment_cache_keeps_reference_context(app):
+    app.build()
+
+    # The same help text refers to a function of the current module, also
+    # inside a class
+    doctree = app.env.get_doctree('modules')
+    modules = [node['py:module'] for node in doctree.findall(addnodes.pending_xref)]
+    assert modules == ['first', 'second', 'second']
+
+
+@pytest.mark.sphinx(
+    'html',
+    testroot='fragment-cache',
+    freshenv=True,
+    confoverrides={'sphinxarg_fragment_cache_size': 0},
+)
+def test_fragment_cache_disabled(app):
+    app.build()
+
+    assert not fragment_cache.enabled
+    assert (fragment_cache.hits, fragment_cache.misses) == (0, 0)
+
+
+def test_disk_cache_roundtrip_and_eviction(tmp_path):
+    cache = DiskCache()
+    cache.configure(tmp_path, max_size=1024)
+
+    assert cache.get('a') is None
+    assert cache.set('a', {'name': 'a' * 600})
+    assert cache.get('a') == {'name': 'a' * 600}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Storing a second large entry pushes the cache over its size cap
+    assert cache.set('b', {'name': 'b' * 600})
+    assert cache.get('a') is None
+    assert cache.get('b') == {'name': 'b' * 600}
+
+
+def test_disk_cache_ignores_unusable_entries(tmp_path):
+    cache = DiskCache()
+    cache.configure(tmp_path, max_size=1024)
+
+    (tmp_path / 'broken.pickle').write_bytes(b'not a pickle')
+    assert cache.get('broken') is None
+    assert not (tmp_path / 'broken.pickle').exists()
+
+    assert not cache.set('unpicklable', {'default': lambda: None})
+
+
+def test_disk_cache_checks_dependencies(tmp_path):
+    cache = DiskCache()
+    cache.configure(tmp_path / 'cache', max_size=1024)
+    dependency = tmp_path / 'commands.py'
+    dependency.write_text('OPTIONS = 1\n', encoding='utf-8')
+
+    assert cache.set('a', {'name': 'a'}, [str(dependency)])
+    assert cache.get('a') == {'name': 'a'}
+    dependency.write_text('OPTIONS = 22\n', encoding='utf-8')
+    assert cache.get('a') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_fingerprint_tracks_source_changes(tmp_path):
+    source = tmp_path / 'cli.py'
+    source.write_text('parser = None\n', encoding='utf-8')
+    before = fingerprint(('key',), [str(source)])
+
+    assert fingerprint(('key',), [str(source)]) == before
+    assert fingerprint(('other key',), [str(source)]) != before
+    source.write_text('parser = 1\n', encoding='utf-8')
+    assert fingerprint(('key',), [str(source)]) != before
+
+
+def test_module_source_files():
+    files = module_source_files('sphinxarg.parser')
+
+    assert files is not None
+    assert [Path(f).name for f in files[:2]] == ['__init__.py', 'parser.py']
+    # The other modules of the package, which the module may import
+    package = Path(files[0]).parent
+    assert sorted(files) == sorted(str(path) for path in package.glob('*.py'))
+    assert module_source_files('sphinxarg.does_not_exist') is None
+
+
+DEPENDENCY_INDEX = """\
+Tool
+====
+
+.. argparse::
+   :module: deps_tool
+   :func: get_parser
+   :prog: tool
+"""
+
+
+@pytest.fixture
+def dependency_project(tmp_path, monkeypatch):
+    """Write a project whose parser module imports its options from another module."""
+    srcdir = tmp_path / 'project'
+    srcdir.mkdir()
+    (srcdir / 'conf.py').write_text("extensions = ['sphinxarg.ext']\n", encoding='utf-8')
+    (srcdir / 'index.rst').write_text(DEPENDENCY_INDEX, encoding='utf-8')
+    (tmp_path / 'deps_tool.py').write_text(
+        'import argparse\n'
+        'import deps_options\n\n'
+        'def get_parser():\n'
+        '    parser = argparse.ArgumentParser()\n'
+        '    parser.add_argument(*deps_options.NAMES)\n'
+        '    return parser\n',
+        encoding='utf-8',
+    )
+    options = tmp_path / 'deps_options.py'
+    options.write_text("NAMES = ['--old']\n", encoding='utf-8')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield srcdir, options
+    for name in ('deps_tool', 'deps_options'):
+        sys.modules.pop(name, None)
+
+
+def test_persistent_cache_tracks_imported_modules(dependency_project, make_app):
+    srcdir, options = dependency_project
+    overrides = {'sphinxarg_persistent_cache': True}
+    make_app('html', srcdir=srcdir, freshenv=True, confoverrides=overrides).build()
+    assert (disk_cache.hits, disk_cache.misses) == (0, 1)
+
+    make_app('html', srcdir=srcdir, freshenv=True, confoverrides=overrides).build()
+    assert (disk_cache.hits, disk_cache.misses) == (1, 0)
+
+    options.write_text("NAMES = ['--new-name']\n", encoding='utf-8')
+    make_app('html', srcdir=srcdir, freshenv=True, confoverrides=overrides).build()
+    assert (disk_cache.hits, disk_cache.misses) == (0, 1)
+
+
+@pytest.mark.sphinx(
+    'html',
+    testroot='command-index',
+    freshenv=True,
+    confoverrides={'sphinxarg_persistent_cache': True},
+)
+def test_persistent_cache_survives_rebuild(app, make_app):
+    app.build()
+    assert (disk_cache.hits, disk_cache.misses) == (0, 1)
+
+    rebuild = make_app(
+        'html',
+        srcdir=app.srcdir,
+        freshenv=True,
+        confoverrides={'sphinxarg_persistent_cache': True},
+    )
+    rebuild.build()
+    # Only the full tree is loaded, the :path: subtrees are navigated from it
+    assert (disk_cache.hits, disk_cache.misses) == (1, 0)
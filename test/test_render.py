@@ -0,0 +1,282 @@
+import argparse
+import sys
+from pathlib import Path
+
+import pytest
+from docutils import nodes
+from docutils.frontend import get_default_settings
+from docutils.parsers.rst import Parser
+
+from sphinxarg.cache import fragment_cache
+from sphinxarg.ext import (
+    _parse_batch,
+    _parse_fragment,
+    _parse_fragments,
+    _plain_paragraphs,
+    ensure_unique_ids,
+    print_subcommands,
+    render_lists,
+)
+from sphinxarg.loader import call_factory, exec_factory
+from sphinxarg.parser import parse_parser
+
+TEST_DIR = Path(__file__).parent
+
+
+def _section_titles(section):
+    return [
+        child.astext() if isinstance(child, nodes.title) else child.tagname
+        for child in section.children
+    ]
+
+
+def test_print_subcommands_section_order():
+    parser = argparse.ArgumentParser(prog='under-test')
+    level1 = parser.add_subparsers().add_parser('level1', help='level1 help', epilog='bye')
+    level1.add_argument('--opt', help='opt help')
+    level1.add_subparsers().add_parser('level2', help='level2 help')
+
+    items = print_subcommands(parse_parser(parser), [])
+
+    assert len(items) == 1
+    assert _section_titles(items[0]) == ['Sub-commands', 'section']
+    level1_section = items[0][1]
+    assert _section_titles(level1_section) == [
+        'level1',
+        'paragraph',
+        'literal_block',
+        'section',
+        'section',
+        'paragraph',
+    ]
+    assert level1_section[3]['ids'] == ['named-arguments']
+    assert level1_section[4]['ids'] == ['Sub-commands']
+    assert _section_titles(level1_section[4][1])[0] == 'level2'
+    assert level1_section[5].astext() == 'bye'
+
+
+def test_deep_subcommand_sections():
+    depth = sys.getrecursionlimit() + 100
+    parser = argparse.ArgumentParser(prog='deep')
+    current = parser
+    for _ in range(depth):
+        current = current.add_subparsers().add_parser('sub')
+
+    items = print_subcommands(parse_parser(parser), [])
+    ensure_unique_ids(items)
+
+    section = items[0]
+    for i in range(depth):
+        suffix = f'_repeat{i}' if i else ''
+        assert section['ids'] == [f'Sub-commands{suffix}']
+        subcommand = section[-1]
+        assert subcommand['ids'] == [f'sub{suffix}']
+        section = subcommand[-1]
+    assert isinstance(section, nodes.literal_block)
+
+
+PLAIN_FRAGMENTS = [
+    'Show this help message and exit',
+    'Possible choices: json, yaml, text\n',
+    'Default: ``\\`quoted\\```',
+    '',
+    'Reads the *config* file, see ``--option-0`` and **notes**.\n\nSecond paragraph.',
+    '- a bullet\n- list',
+    '1. an enumerated\n2. list\n',
+    'term\n    definition',
+    ':field: list\n:other: field',
+    '-a  an option\n--bb  list',
+    '> quoted\n\n    block quote',
+    'Some code::\n\n    run --fast\n\nAfter the code.',
+    '.. note:: Nested directive.',
+    'A line block:\n\n| one\n| two',
+    '    Starts indented',
+]
+
+#: Fragments that can't share a document with others
+ENTANGLED_FRAGMENTS = [
+    'Title\n=====\n\nBody',
+    'See target_.\n\n.. _target: https://example.org',
+    'A footnote [#]_.\n\n.. [#] The note.',
+    'A |sub|.\n\n.. |sub| replace:: substitution',
+    'Ends with a literal block marker::',
+    'Unknown `role`:unknown-role:',
+    'Before\n\n~~~~~~~~~~~~~~~~~~~\n\nAfter',
+    'A transition\n\n----\n\nin a text',
+]
+
+
+def _dump(children):
+    return [
+        (
+            node.pformat(),
+            [
+                (n.line, n.source, n.rawsource if isinstance(n, nodes.Element) else None)
+                for n in node.findall()
+            ],
+        )
+        for node in children
+    ]
+
+
+@pytest.mark.parametrize('entangled', [None, *ENTANGLED_FRAGMENTS])
+def test_parse_fragments_matches_separate_documents(entangled):
+    settings = get_default_settings(Parser)
+    settings.report_level = 5
+    texts = PLAIN_FRAGMENTS if entangled is None else [*PLAIN_FRAGMENTS, entangled]
+
+    batch = _parse_batch(texts, settings)
+    parsed = _parse_fragments(texts, settings)
+
+    assert (batch is None) == (entangled is not None)
+    expected = [_dump(_parse_fragment(text, settings)) for text in texts]
+    assert [_dump(children) for children in parsed] == expected
+    if batch is not None:
+        assert [_dump(children) for children in batch] == expected
+
+
+def test_render_lists_keeps_definitions():
+    definition = nodes.definition('', nodes.paragraph(text='nested'))
+    lists = [['first', 'Default: ``1``'], [], [definition, 'second']]
+
+    rendered = render_lists(lists, False)
+
+    assert [[node.astext() for node in children] for children in rendered] == [
+        ['first', 'Default: 1'],
+        [],
+        ['nested', 'second'],
+    ]
+
+
+def test_fragment_cache_returns_parsed_nodes():
+    settings = get_default_settings(Parser)
+    settings.report_level = 5
+    lists = [[text] for text in PLAIN_FRAGMENTS + ENTANGLED_FRAGMENTS]
+    expected = [_dump(children) for children in render_lists(lists, False, settings)]
+
+    fragment_cache.configure(64)
+    try:
+        first = render_lists(lists, False, settings)
+        second = render_lists(lists, False, settings)
+        cached = {key[0] for key in fragment_cache._entries}
+    finally:
+        fragment_cache.configure(0)
+
+    assert [_dump(children) for children in first] == expected
+    assert [_dump(children) for children in second] == expected
+    # Plain texts, directives, targets, ids and warnings are never reused
+    assert cached == {
+        'Default: ``\\`quoted\\```',
+        'Reads the *config* file, see ``--option-0`` and **notes**.\n\nSecond paragraph.',
+        '- a bullet\n- list',
+        '1. an enumerated\n2. list\n',
+        'term\n    definition',
+        ':field: list\n:other: field',
+        '-a  an option\n--bb  list',
+        '> quoted\n\n    block quote',
+        'Some code::\n\n    run --fast\n\nAfter the code.',
+        'A line block:\n\n| one\n| two',
+        '    Starts indented',
+        'Before\n\n~~~~~~~~~~~~~~~~~~~\n\nAfter',
+        'A transition\n\n----\n\nin a text',
+    }
+
+
+#: Texts rendered without docutils
+PLAIN_TEXTS = [
+    'Path to the config file.',
+    'Number of workers (default: 4).',
+    'Possible choices: rock, paper, scissors\n',
+    'Use \'quotes\' and "double quotes" -- really.',
+    '100% sure; a & b, A > B and C < D.',
+    'Value in [0, 1], e.g. 0.5, i.e. a ratio?',
+    'Enable dry_run mode, see www.example.com',
+    'Unicode: café, naïve – dash',
+    'Ends with a colon:',
+    'Multiple\nlines of help',
+    'Trailing spaces   \nand lines  ',
+    '\n\nTwo\n\n\nparagraphs\n\n',
+    '',
+]
+
+#: Texts that may hold markup, parsed by docutils
+MARKUP_TEXTS = [
+    'Use ``code``',
+    'An *emphasis*',
+    'See :ref:`target`',
+    'See http://example.com',
+    'Mail me@example.com',
+    'Refer to name_ here',
+    'Refer to __init__',
+    'Follows PEP 8',
+    'RFC 2822 dates',
+    '- bullet',
+    '* bullet',
+    '\u2022 bullet',
+    '1. first',
+    '(a) item',
+    '#. auto',
+    '-v  verbose',
+    '/V  DOS option',
+    '>>> 1 + 1',
+    'Title\n=====',
+    'Text\n\n----\n\nText',
+    'Text::',
+    'Ratio 3:2',
+    'a\tb',
+    'Term\n    definition',
+    ':field: value',
+    '.. comment',
+    'A |substitution|',
+    'Back\\slash',
+    'Line\u2028separator',
+    'Carriage\rreturn',
+    '=== ===\na   b\n=== ===',
+]
+
+
+def _sample_texts():
+    texts = []
+    for filename, attr_name in [
+        ('sample.py', 'parser'),
+        ('sample-directive-opts.py', 'get_parser'),
+        ('sample-directive-special.py', 'get_parser'),
+        ('sample-default-supressed.py', 'get_parser'),
+        ('sample2.py', 'blah'),
+    ]:
+        parser = call_factory(exec_factory(str(TEST_DIR / filename), attr_name))
+        trees = [parse_parser(parser)]
+        while trees:
+            tree = trees.pop()
+            trees.extend(tree.get('children', ()))
+            texts += [tree.get('description') or '', tree.get('help') or '']
+            for group in tree.get('action_groups', ()):
+                texts += [group['description'] or '']
+                texts += [option['help'] or '' for option in group['options']]
+    return texts
+
+
+CORPUS = sorted({
+    *PLAIN_TEXTS,
+    *MARKUP_TEXTS,
+    *PLAIN_FRAGMENTS,
+    *ENTANGLED_FRAGMENTS,
+    *_sample_texts(),
+})
+
+
+@pytest.mark.parametrize('text', CORPUS)
+def test_plain_paragraphs_match_docutils(text):
+    settings = get_default_settings(Parser)
+    settings.report_level = 5
+
+    plain = _plain_paragraphs(text)
+
+    if plain is not None:
+        assert _dump(plain) == _dump(_parse_fragment(text, settings))
+    assert (plain is not None) == (text in PLAIN_TEXTS) or text not in MARKUP_TEXTS
+
+
+def test_plain_text_detection():
+    assert [text for text in PLAIN_TEXTS if _plain_paragraphs(text) is None] == []
+    assert [text for text in MARKUP_TEXTS if _plain_paragraphs(text) is not None] == []
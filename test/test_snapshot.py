@@ -0,0 +1,145 @@
+import argparse
+import io
+import json
+import runpy
+from pathlib import Path
+
+import pytest
+from sphinx import addnodes
+
+from sphinxarg.__main__ import main
+from sphinxarg.model import ParserNode
+from sphinxarg.parser import parse_parser, parse_parser_path, parser_navigate
+from sphinxarg.snapshot import SCHEMA_VERSION, dump_snapshot, iter_tree_json, load_snapshot
+
+SAMPLE = Path(__file__).parent / 'sample-directive-opts.py'
+
+
+def _parser(json_values=True):
+    parser = argparse.ArgumentParser(
+        prog='snap', description='Snapshot me.', epilog='The end.'
+    )
+    if json_values:
+        parser.add_argument(
+            '--level', type=int, choices=[0, 1, 2], default=1, help='%(default)s'
+        )
+    else:
+        parser.add_argument('--path', type=Path, default=Path('/tmp'), help='%(default)s')
+        parser.add_argument('--level', type=int, choices=range(3), default=1)
+        parser.add_argument('--pair', nargs=2, default=('a', 'b'))
+    install = parser.add_subparsers().add_parser('install', aliases=['i'], help='Install.')
+    install.add_subparsers().add_parser('now', help=None).add_argument('--force')
+    return parser
+
+
+def _roundtrip(tree, **kwargs):
+    buffer = io.StringIO()
+    dump_snapshot(tree, buffer, **kwargs)
+    buffer.seek(0)
+    return load_snapshot(buffer)
+
+
+def test_snapshot_roundtrip():
+    tree = parse_parser(_parser())
+    document = _roundtrip(tree, fingerprint='abc', source={'module': 'snap'})
+    loaded = document['tree']
+
+    assert document['schema_version'] == SCHEMA_VERSION
+    assert (document['fingerprint'], document['source']) == ('abc', {'module': 'snap'})
+    assert isinstance(loaded, ParserNode)
+    assert loaded == tree
+    leaf = parser_navigate(loaded, 'i now')
+    assert leaf is loaded['children'][0]['children'][0]
+    assert leaf.command == 'snap install (i) now'
+    assert leaf['parent'] == tree['children'][0]['children'][0]['parent']
+
+
+def test_snapshot_roundtrip_path():
+    tree = parse_parser_path(_parser(), 'i now')
+    loaded = _roundtrip(tree)['tree']
+
+    assert loaded == tree
+    assert loaded['help'] is None
+    assert loaded['parent'] == tree['parent']
+    assert loaded.command == tree.command == 'snap install (i) now'
+
+
+def test_snapshot_converts_defaults_and_choices_for_rendering():
+    tree = parse_parser(_parser(json_values=False))
+    loaded = _roundtrip(tree)['tree']
+
+    options = tree['action_groups'][0]['options']
+    loaded_options = loaded['action_groups'][0]['options']
+    assert loaded_options[0]['default'] == '/tmp'
+    assert loaded_options[1]['choices'] == [0, 1, 2]
+    assert loaded_options[2]['default'] == "('a', 'b')"
+    for option, loaded_option in zip(options, loaded_options, strict=True):
+        assert str(loaded_option['default']) == str(option['default'])
+        if 'choices' in option:
+            assert list(map(str, loaded_option['choices'])) == list(
+                map(str, option['choices'])
+            )
+
+
+def test_snapshot_streams_nodes():
+    tree = parse_parser(_parser())
+    chunks = list(iter_tree_json(tree))
+
+    assert len(chunks) > 3
+    assert json.loads(''.join(chunks))['children'][0]['name'] == 'install (i)'
+
+
+def test_snapshot_schema_version_checked():
+    with pytest.raises(ValueError, match='schema version 99'):
+        load_snapshot(io.StringIO('{"schema_version": 99, "tree": {}}'))
+
+
+def test_dump_command(tmp_path):
+    output = tmp_path / 'parser.json'
+    main([
+        'dump',
+        '--filename',
+        str(SAMPLE),
+        '--func',
+        'get_parser',
+        '--prog',
+        'dumped',
+        '--path',
+        'A',
+        '--formatter-width',
+        '80',
+        '-o',
+        str(output),
+    ])
+
+    with open(output, encoding='utf-8') as f:
+        document = load_snapshot(f)
+    assert document['fingerprint'] is not None
+    assert document['source']['filename'] == str(SAMPLE)
+    assert document['source']['path'] == 'A'
+    assert document['tree']['bare_usage'] == 'dumped A [-h] baz'
+    get_parser = runpy.run_path(str(SAMPLE))['get_parser']
+    expected = parse_parser_path(get_parser(), 'A', prog='dumped', formatter_width=80)
+    assert document['tree'] == expected
+    assert document['tree'].command == expected.command == 'dumped A'
+
+
+def test_dump_command_to_stdout(capsys):
+    main(['dump', '--ref', 'test.sample.parser'])
+
+    document = load_snapshot(io.StringIO(capsys.readouterr().out))
+    assert [child['name'] for child in document['tree']['children']] == ['apply', 'game']
+
+
+@pytest.mark.sphinx('html', testroot='snapshot', freshenv=True)
+def test_snapshot_directive_matches_extraction(app):
+    app.build()
+
+    assert app._warning.getvalue() == ''
+    index = app.env.get_doctree('index')
+    extracted = app.env.get_doctree('extracted')
+    # The toctree is the only difference between the pages
+    for toctree in index.findall(addnodes.toctree):
+        toctree.parent.parent.remove(toctree.parent)
+    assert [node.pformat() for node in index] == [node.pformat() for node in extracted]
+    assert SAMPLE.with_suffix('.json') in set(map(Path, app.env.dependencies['index']))
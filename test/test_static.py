@@ -0,0 +1,261 @@
+from pathlib import Path
+
+import pytest
+
+from sphinxarg.loader import ParserSource, call_factory, exec_factory
+from sphinxarg.parser import parse_parser
+from sphinxarg.static import DynamicCodeException, load_static, static_parser
+
+TEST_DIR = Path(__file__).parent
+
+
+@pytest.mark.parametrize(
+    ('filename', 'attr_name'),
+    [
+        ('sample-directive-opts.py', 'get_parser'),
+        ('sample-directive-special.py', 'get_parser'),
+        ('sample-default-supressed.py', 'get_parser'),
+        ('sample.py', 'parser'),
+    ],
+)
+def test_static_matches_exec(filename, attr_name):
+    file = str(TEST_DIR / filename)
+    executed = call_factory(exec_factory(file, attr_name))
+
+    assert parse_parser(load_static(file, attr_name)) == parse_parser(executed)
+
+
+def test_static_does_not_execute():
+    source = """
+import argparse as ap
+from argparse import RawTextHelpFormatter
+
+import not_installed_anywhere
+
+raise SystemExit('executed')
+
+NAME = 'tool'
+VERSION = not_installed_anywhere.version()
+
+def get_parser(prog=NAME, *, width=80):
+    '''Build the parser.'''
+    parser = ap.ArgumentParser(prog=prog, formatter_class=RawTextHelpFormatter)
+    parser.add_argument('--width', type=int, default=width, help=f'{NAME} width')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('-q', action='store_true', help=ap.SUPPRESS)
+    subparsers = parser.add_subparsers()
+    subparsers.add_parser('run', aliases=['r'], help='run ' + NAME)
+    parser.set_defaults(verbose=-1)
+    return parser
+
+if __name__ == '__main__':
+    get_parser().parse_args()
+"""
+    parser = static_parser(source, 'get_parser')
+
+    assert parser.prog == 'tool'
+    assert parser.get_default('width') == 80
+    assert parser.get_default('verbose') == -1
+    tree = parse_parser(parser)
+    assert [child.name for child in tree.children] == ['run (r)']
+    assert tree.action_groups[-1].options[0].help == 'tool width'
+
+
+def test_static_passparser():
+    source = """
+def fill(parser):
+    parser.add_argument('--level', choices=[1, 2])
+"""
+    parser = static_parser(source, 'fill', passparser=True)
+
+    assert parser.get_default('level') is None
+    assert parser._actions[-1].choices == [1, 2]
+
+
+@pytest.mark.parametrize(
+    ('source', 'reason'),
+    [
+        (
+            'import argparse\n'
+            'def get_parser():\n'
+            '    parser = argparse.ArgumentParser()\n'
+            '    for name in ["--a", "--b"]:\n'
+            '        parser.add_argument(name)\n'
+            '    return parser\n',
+            'For statement',
+        ),
+        (
+            'import argparse\n'
+            'from helpers import add_common\n'
+            'def get_parser():\n'
+            '    parser = argparse.ArgumentParser()\n'
+            '    add_common(parser)\n'
+            '    return parser\n',
+            "name 'add_common' has no static value",
+        ),
+        (
+            'import argparse\n'
+            'def level(value):\n'
+            '    return int(value)\n'
+            'def get_parser():\n'
+            '    parser = argparse.ArgumentParser()\n'
+            '    parser.add_argument("--level", type=level)\n'
+            '    return parser\n',
+            "name 'level' has no static value",
+        ),
+        (
+            'import argparse\n'
+            'parser = argparse.ArgumentParser()\n'
+            'for name in ["--a", "--b"]:\n'
+            '    parser.add_argument(name)\n',
+            'For statement using the parser',
+        ),
+        (
+            'import argparse\n'
+            'parser = argparse.ArgumentParser()\n'
+            '@register(parser)\n'
+            'def cmd():\n'
+            '    pass\n',
+            'FunctionDef statement using the parser',
+        ),
+        (
+            'import argparse\n'
+            'parser = argparse.ArgumentParser()\n'
+            'class Plugin:\n'
+            '    parser.add_argument("--from-class")\n',
+            'ClassDef statement using the parser',
+        ),
+        (
+            'import argparse\n'
+            'parser = argparse.ArgumentParser()\n'
+            'def f(a=parser.add_argument("--from-default")):\n'
+            '    pass\n',
+            'FunctionDef statement using the parser',
+        ),
+        (
+            'import argparse\n'
+            'def get_parser():\n'
+            '    return argparse.ArgumentParser().parse_args()\n',
+            "attribute 'parse_args' has no static value",
+        ),
+        ('def get_parser():\n    return None\n', "'get_parser' is not a statically built"),
+    ],
+)
+def test_static_dynamic_code(source, reason):
+    with pytest.raises(DynamicCodeException, match=reason):
+        static_parser(source, 'get_parser' if 'get_parser' in source else 'parser')
+
+
+MUTATED_SOURCE = """
+import argparse
+import functools
+
+CHOICES = ['a']
+ALIAS = CHOICES
+DEFAULTS = {'fmt': 'json', 'choices': CHOICES}
+LEVEL = 1
+CHOICES.append('b')
+DEFAULTS['fmt'] = 'yaml'
+DEFAULTS.update(level=2)
+
+@functools.cache
+def configure():
+    global LEVEL
+    LEVEL = 2
+
+configure()
+
+def get_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(ARGUMENT)
+    return parser
+"""
+
+
+@pytest.mark.parametrize(
+    'argument',
+    [
+        "'--choice', choices=CHOICES",
+        "'--alias', choices=ALIAS",
+        "'--fmt', default=DEFAULTS",
+        "'--level', default=LEVEL",
+    ],
+)
+def test_static_forgets_changed_values(tmp_path, argument):
+    source = MUTATED_SOURCE.replace('ARGUMENT', argument)
+    with pytest.raises(DynamicCodeException, match='has no static value'):
+        static_parser(source, 'get_parser')
+
+    file = tmp_path / 'mutated.py'
+    file.write_text(source, encoding='utf-8')
+    static = ParserSource('filename', str(file), 'get_parser', static=True).load()
+    executed = call_factory(exec_factory(str(file), 'get_parser'))
+    assert parse_parser(static) == parse_parser(executed)
+
+
+def test_static_defaults_evaluated_when_defined():
+    source = """
+import argparse
+NAME = 'a'
+def get_parser(prog=NAME, *, unknown=UNKNOWN):
+    return argparse.ArgumentParser(prog=prog)
+NAME = 'b'
+"""
+    with pytest.raises(DynamicCodeException, match="name 'UNKNOWN' has no static value"):
+        static_parser(source, 'get_parser')
+    source = source.replace(', *, unknown=UNKNOWN', '')
+    assert static_parser(source, 'get_parser').prog == 'a'
+
+
+def test_static_unchanged_values_are_kept():
+    source = """
+import argparse
+CHOICES = ['a']
+NAMES = ['x']
+NAMES.append('y')
+print(len(NAMES))
+parser = argparse.ArgumentParser()
+parser.add_argument('--choice', choices=CHOICES)
+"""
+    assert static_parser(source, 'parser')._actions[-1].choices == ['a']
+
+
+def test_static_fails_on_changed_argparse_values():
+    source = """
+import argparse
+CHOICES = ['a']
+parser = argparse.ArgumentParser()
+parser.add_argument('--choice', choices=CHOICES)
+CHOICES.append('b')
+"""
+    with pytest.raises(DynamicCodeException, match='may change a value given to argparse'):
+        static_parser(source, 'parser')
+
+
+def test_static_falls_back_to_exec(tmp_path):
+    file = tmp_path / 'dynamic.py'
+    file.write_text(
+        'import argparse\n'
+        'def get_parser():\n'
+        '    parser = argparse.ArgumentParser(prog="dynamic")\n'
+        '    for name in ["--a", "--b"]:\n'
+        '        parser.add_argument(name)\n'
+        '    return parser\n'
+    )
+    parser = ParserSource('filename', str(file), 'get_parser', static=True).load()
+
+    assert [action.dest for action in parser._actions] == ['help', 'a', 'b']
+
+
+@pytest.mark.sphinx('html', testroot='static', freshenv=True)
+def test_static_build(app, monkeypatch):
+    def exec_file(*args):
+        msg = 'executed'
+        raise AssertionError(msg)
+
+    monkeypatch.setattr('sphinxarg.loader.exec_file', exec_file)
+    app.build()
+
+    html = (app.outdir / 'index.html').read_text(encoding='utf-8')
+    assert 'B subparser' in html
+    assert app._warning.getvalue() == ''
@@ -0,0 +1,78 @@
+import shutil
+import time
+
+import pytest
+
+from sphinxarg.loader import _LoadTimeoutError, call_with_timeout
+
+TIMEOUT = {'sphinxarg_factory_timeout': 0.5}
+
+
+def test_call_with_timeout():
+    assert call_with_timeout(sorted, 1, [2, 1]) == [1, 2]
+    with pytest.raises(ZeroDivisionError):
+        call_with_timeout(divmod, 1, 1, 0)
+    with pytest.raises(_LoadTimeoutError):
+        call_with_timeout(time.sleep, 0.01, 1)
+
+
+def test_call_with_timeout_raising_timeout_error():
+    def connect():
+        msg = 'connection timed out'
+        raise TimeoutError(msg)
+
+    with pytest.raises(TimeoutError, match='connection timed out'):
+        call_with_timeout(connect, 1)
+
+
+@pytest.mark.parametrize('timeout', [None, 0.5])
+def test_factory_raising_timeout_error(make_app, rootdir, tmp_path, monkeypatch, timeout):
+    srcdir = tmp_path / 'slow-factory'
+    shutil.copytree(rootdir / 'test-slow-factory', srcdir)
+    monkeypatch.setenv('SPHINXARG_TEST_ERROR', 'plugin registry timed out')
+    app = make_app('html', srcdir=srcdir, confoverrides={'sphinxarg_factory_timeout': timeout})
+    with pytest.raises(TimeoutError, match='plugin registry timed out'):
+        app.build()
+
+
+@pytest.mark.sphinx('html', testroot='slow-factory', freshenv=True, confoverrides=TIMEOUT)
+def test_timeout_uses_last_good_tree(app, make_app, monkeypatch):
+    app.build()
+    assert app._warning.getvalue() == ''
+
+    monkeypatch.setenv('SPHINXARG_TEST_DELAY', '3')
+    rebuild = make_app('html', srcdir=app.srcdir, freshenv=True, confoverrides=TIMEOUT)
+    start = time.perf_counter()
+    rebuild.build()
+
+    assert time.perf_counter() - start < 3
+    warnings = rebuild._warning.getvalue()
+    assert 'loading the parser `sample-slow.py` took longer than 0.5s' in warnings
+    assert 'using the tree extracted by an earlier build' in warnings
+    html = (rebuild.outdir / 'index.html').read_text(encoding='utf-8')
+    assert 'Not slow at all' in html
+
+
+@pytest.mark.sphinx('html', testroot='slow-factory', freshenv=True, confoverrides=TIMEOUT)
+def test_timeout_without_last_good_tree(app, monkeypatch):
+    # Left behind by other tests using the same test root
+    shutil.rmtree(app.doctreedir / 'sphinxarg-last-good', ignore_errors=True)
+    monkeypatch.setenv('SPHINXARG_TEST_DELAY', '3')
+    app.build()
+
+    assert 'no earlier build extracted it' in app._warning.getvalue()
+
+
+@pytest.mark.sphinx(
+    'html',
+    testroot='slow-factory',
+    freshenv=True,
+    confoverrides={'sphinxarg_factory_warning_time': 0.1},
+)
+def test_slow_factory_warning(app, monkeypatch):
+    monkeypatch.setenv('SPHINXARG_TEST_DELAY', '0.2')
+    app.build()
+
+    assert 'WARNING: [sphinxarg] loading the parser `sample-slow.py` took 0.2' in (
+        app._warning.getvalue()
+    )
@@ -0,0 +1,105 @@
+import json
+import pstats
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from sphinxarg.ext import _merge_timings
+from sphinxarg.timing import NO_TIMING, PHASES, DirectiveTiming, summarize, write_report
+
+
+def test_nested_phases_count_once():
+    timing = DirectiveTiming('index', 4, 'cli.get_parser')
+    with timing.phase('render'):
+        time.sleep(0.02)
+        with timing.phase('domain'):
+            time.sleep(0.02)
+
+    assert timing.phases['domain'] >= 0.02
+    assert 0.02 <= timing.phases['render'] < 0.04
+    assert timing.total == pytest.approx(timing.phases['render'] + timing.phases['domain'])
+    with NO_TIMING.phase('render'):
+        pass
+
+
+def test_summary_and_report(tmp_path):
+    timings = []
+    for docname, lineno, seconds in (('a', 1, 0.5), ('b', 1, 2.0), ('a', 9, 1.0)):
+        timing = DirectiveTiming(docname, lineno, f'cli {lineno}')
+        timing.phases['parse'] = seconds
+        timings.append(timing)
+
+    lines = summarize(timings, top=1)
+    assert lines[0] == '3 directives in 2 documents took 3.500s: parse 3.500s'
+    assert lines[1:] == [
+        'slowest documents:',
+        '     2.000s  b (1 directives)',
+        'slowest directives:',
+        '     2.000s  b:1 cli 1 (parse 2.000s)',
+    ]
+
+    write_report(timings, str(tmp_path / 'timing.json'))
+    report = json.loads((tmp_path / 'timing.json').read_text(encoding='utf-8'))
+    assert report['total'] == 3.5
+    assert [document['docname'] for document in report['documents']] == ['b', 'a']
+    assert [directive['lineno'] for directive in report['directives']] == [1, 9, 1]
+
+
+@pytest.mark.sphinx(
+    'html',
+    testroot='parser-cache',
+    freshenv=True,
+    confoverrides={'sphinxarg_timing_report': 'sphinxarg-timing.json'},
+)
+def test_timing_build(app):
+    app.build()
+
+    assert 'slowest directives:' in app._status.getvalue()
+    report = json.loads((app.outdir / 'sphinxarg-timing.json').read_text(encoding='utf-8'))
+    assert report['documents'] == [
+        {'docname': 'index', 'total': report['total'], 'directives': 3}
+    ]
+    labels = sorted(directive['label'] for directive in report['directives'])
+    assert labels == [
+        'sample-directive-opts.py',
+        'sample-directive-opts.py A',
+        'sample-directive-opts.py A',
+    ]
+    for directive in report['directives']:
+        assert directive['phases'].keys() == set(PHASES)
+        assert directive['phases']['render'] > 0
+    # Only the first directive extracts, the other two navigate or hit the cache
+    assert sum(directive['phases']['parse'] > 0 for directive in report['directives']) == 1
+
+
+def test_merge_timings_of_read_documents():
+    first, second = DirectiveTiming('first', 1, 'a'), DirectiveTiming('second', 1, 'b')
+    env = SimpleNamespace(sphinxarg_timings=[first])
+    # A worker forked after the timings of 'first' were merged
+    other = SimpleNamespace(sphinxarg_timings=[first, second])
+
+    _merge_timings(None, env, {'second'}, other)
+
+    assert env.sphinxarg_timings == [first, second]
+
+
+@pytest.mark.sphinx('html', testroot='parser-cache', freshenv=True)
+def test_timing_disabled(app):
+    app.build()
+
+    assert app.env.sphinxarg_timings == []
+    assert 'slowest directives:' not in app._status.getvalue()
+
+
+@pytest.mark.sphinx(
+    'html', testroot='parser-cache', freshenv=True, confoverrides={'sphinxarg_profile': True}
+)
+def test_profile_build(app):
+    app.build()
+
+    profiles = sorted(path.name for path in (app.outdir / 'sphinxarg-profiles').iterdir())
+    assert profiles == ['index-L15.pstats', 'index-L4.pstats', 'index-L9.pstats']
+    stats = pstats.Stats(str(app.outdir / 'sphinxarg-profiles' / 'index-L4.pstats'))
+    functions = {function for _file, _line, function in stats.stats}
+    assert {'parse_parser', 'ensure_unique_ids'} <= functions